@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('loop_stats.bravais_lattice',
+           'loop_stats.loops',
+           'loop_stats.loops.simulator')
+# none of these are needed to build a lattice and sweep it
+HEAVY = ('matplotlib', 'networkx', 'pandas', 'tqdm')
+
+
+def import_time(module: str) -> Dict[str, object]:
+    # a fresh interpreter per measurement, -X importtime reports cumulative microseconds per module
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = dict()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or ('|' not in line):
+            continue
+        _, total, name = [field.strip() for field in line[len('import time:'):].split('|')]
+        if total.isdigit():
+            cumulative[name] = int(total)
+    loaded = sorted({name.split('.')[0] for name in cumulative} & set(HEAVY))
+    return dict(module=module, seconds=cumulative.get(module, 0) * 1e-6, heavy=loaded)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure how long the package modules take to import")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help="write results as json here")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        result = dict(module=module, seconds=min(r['seconds'] for r in runs), heavy=runs[0]['heavy'])
+        results.append(result)
+        print(f"{module:>30s} {result['seconds'] * 1e3:8.1f}ms {' '.join(result['heavy'])}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    # a heavy dependency on the import path is a regression, whatever the timing
+    return 1 if any(r['heavy'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loop_stats.bravais_lattice import BravaisLattice, BravaisLatticeType, get_basis_pair
+from loop_stats.loops import FundamentalLoopDefect, anti_cycle, generate_defect_coordinates
+from loop_stats.loops.simulator import (BravaisLatticeWithLoopDefects,
+                                        LoopDefectSimulator,
+                                        independent_node_partition)
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PROFILES = dict(quick={2: (32, 128), 3: (8, 16)},
+                full={2: (32, 128, 512), 3: (8, 16, 48)})
+BENCHMARKS: Dict[str, Callable] = dict()
+
+
+def benchmark(name: str):
+    def register(func: Callable):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def plaquette_loops(ndim: int) -> List[FundamentalLoopDefect]:
+    if ndim == 2:
+        loop = FundamentalLoopDefect([(0, 1), (1, 0), (0, -1), (-1, 0)])
+    else:
+        loop = FundamentalLoopDefect([(0, 1, 0), (0, 0, 1), (0, -1, 0), (0, 0, -1)])
+    return [loop, anti_cycle(loop)]
+
+
+def lattice_types() -> List[Tuple[str, int, str]]:
+    types = []
+    for lattice_type in BravaisLatticeType:
+        try:
+            basis, _ = get_basis_pair(lattice_type)
+            types.append((lattice_type.name, len(basis), None))
+        except Exception as e:
+            types.append((lattice_type.name, 0, str(e)))
+    return types
+
+
+# each benchmark does its setup and returns the call that is timed
+@benchmark('build')
+def bench_build(basis, params, size) -> Callable[[], Any]:
+    return lambda: BravaisLattice(basis, size=size, show_progress=False, **params)
+
+
+@benchmark('partition')
+def bench_partition(basis, params, size) -> Callable[[], Any]:
+    lattice = BravaisLattice(basis, size=size, show_progress=False, **params)
+    loops = plaquette_loops(lattice.ndim)
+    return lambda: independent_node_partition(lattice, loops)
+
+
+@benchmark('defect_coordinates')
+def bench_defect_coordinates(basis, params, size) -> Callable[[], Any]:
+    lattice = BravaisLattice(basis, size=size, show_progress=False, **params)
+    loop = plaquette_loops(lattice.ndim)[0]
+    starts = lattice.coordinate[np.linspace(0, lattice.size - 1, min(lattice.size, 1000)).astype(int)].tolist()
+    return lambda: [generate_defect_coordinates(loop, start, lattice.shape) for start in starts]
+
+
+@benchmark('sweep')
+def bench_sweep(basis, params, size) -> Callable[[], Any]:
+    system = BravaisLatticeWithLoopDefects(basis, size=size, show_progress=False, **params)
+    system.register_loop(plaquette_loops(system.ndim))
+    simulator = LoopDefectSimulator(system, beta=1.0, chemical_potential=-0.25, seed=0)
+    return lambda: simulator.sweep(1)
+
+
+def measure(setup: Callable[[], Callable[[], Any]], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        func = setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    # memory in a separate run, tracing slows the timed code down
+    func = setup()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(seconds=min(times), peak_bytes=peak)
+
+
+def run(profile: str,
+        repeat: int,
+        only: List[str] = None,
+        lattices: List[str] = None,
+        ) -> List[Dict[str, Any]]:
+    results = []
+    for name, ndim, error in lattice_types():
+        if lattices and (name not in lattices):
+            continue
+        if error is not None:
+            results.append(dict(benchmark='*', lattice_type=name, size=None, skipped=error))
+            continue
+        basis, params = get_basis_pair(name)
+        for size in PROFILES[profile][ndim]:
+            n_sites = BravaisLattice(basis, size=size, lazy=True, **params).size
+            for bench, func in BENCHMARKS.items():
+                if only and (bench not in only):
+                    continue
+                result = dict(benchmark=bench, lattice_type=name, size=size, n_sites=n_sites)
+                result.update(measure(lambda: func(basis, params, size), repeat))
+                results.append(result)
+                print(f"{bench:>20s} {name:>5s} {size:>4d} {result['seconds']:10.4f}s "
+                      f"{result['peak_bytes'] / 2 ** 20:10.2f}MB", file=sys.stderr)
+    return results
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['benchmark']}/{result['lattice_type']}/{result['size']}"
+
+
+def compare(results: List[Dict[str, Any]],
+            baseline: List[Dict[str, Any]],
+            tolerance: float,
+            memory_tolerance: float,
+            min_seconds: float = 1e-3,
+            min_bytes: int = 1 << 20,
+            ) -> List[str]:
+    reference = {result_key(r): r for r in baseline if 'seconds' in r}
+    regressions = []
+    for result in results:
+        base = reference.get(result_key(result))
+        if (base is None) or ('seconds' not in result):
+            continue
+        # small absolute differences are noise, whatever their ratio
+        slower = result['seconds'] - base['seconds']
+        if (slower > min_seconds) and (result['seconds'] > (1 + tolerance) * base['seconds']):
+            regressions.append(f"{result_key(result)}: {result['seconds']:.4f}s vs {base['seconds']:.4f}s")
+        grown = result['peak_bytes'] - base['peak_bytes']
+        if (grown > min_bytes) and (result['peak_bytes'] > (1 + memory_tolerance) * base['peak_bytes']):
+            regressions.append(f"{result_key(result)}: {result['peak_bytes']} bytes vs {base['peak_bytes']} bytes")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time and measure the peak memory of the lattice/loop pipeline")
+    parser.add_argument('--profile', choices=sorted(PROFILES.keys()), default='quick')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS.keys()))
+    parser.add_argument('--lattice', nargs='*')
+    parser.add_argument('--output', default=None, help="write results as json here")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help="allowed relative slow down")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="allowed relative memory growth")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run(args.profile, args.repeat, args.only, args.lattice)
+    report = dict(meta=dict(profile=args.profile,
+                            repeat=args.repeat,
+                            python=platform.python_version(),
+                            numpy=np.__version__,
+                            machine=platform.machine(),
+                            created=time.strftime('%Y-%m-%dT%H:%M:%S')),
+                  results=results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, nothing to compare", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['results'], args.tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
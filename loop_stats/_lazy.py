@@ -0,0 +1,16 @@
+import sys
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_module(name: str, mapping: Dict[str, str]) -> Tuple[Callable[[str], Any], List[str]]:
+    # mapping is attribute -> relative module; returns the module level __getattr__ and the lazy names,
+    # which go into __all__ so star imports resolve them too
+    def __getattr__(attr: str) -> Any:
+        if attr in mapping:
+            value = getattr(importlib.import_module(mapping[attr], name), attr)
+            # later lookups find the attribute directly and skip __getattr__
+            setattr(sys.modules[name], attr, value)
+            return value
+        raise AttributeError(f"module {name!r} has no attribute {attr!r}")
+    return __getattr__, sorted(mapping)
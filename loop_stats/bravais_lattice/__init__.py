@@ -1,6 +1,23 @@
+from loop_stats._lazy import lazy_module
 from .basis_vector import BasisVector, BasisVector2D, BasisVector3D
 from .lattice_coordinates import LatticeCoordinate, to_lattice_coordinate, check_coordinate_validity
+from .lattice_coordinates import from_doubled, to_doubled, pack_doubled, unpack_doubled
+from .lattice_coordinates import check_coordinate_validity_batch
 from .bravais_basis import get_basis_pair, BravaisLatticeType, to_bravais_lattice_type
 from .bravais_lattice import BravaisLattice
-from .plot_utility import plot_lattice_grid
-from .bravais_system import BravaisSystem, LatticeInfo, LatticeInfoFactory
+from .cache import LatticeCache, cache_key
+from .symmetry import point_group, lattice_point_group
+from .neighbors import neighbor_shells
+from .reduction import lll_reduce, minimum_image
+from .bravais_system import BravaisSystem, LatticeInfo, LatticeInfoFactory, LatticeInfoArray, LatticeInfoView
+
+
+# plotting pulls in matplotlib, which a headless worker never needs
+__getattr__, _lazy_names = lazy_module(__name__, dict(plot_lattice_grid='.plot_utility'))
+
+__all__ = ['BasisVector', 'BasisVector2D', 'BasisVector3D', 'LatticeCoordinate', 'to_lattice_coordinate',
+           'check_coordinate_validity', 'from_doubled', 'to_doubled', 'pack_doubled', 'unpack_doubled',
+           'check_coordinate_validity_batch', 'get_basis_pair', 'BravaisLatticeType',
+           'to_bravais_lattice_type', 'BravaisLattice', 'LatticeCache', 'cache_key', 'point_group',
+           'lattice_point_group', 'neighbor_shells', 'lll_reduce', 'minimum_image', 'BravaisSystem',
+           'LatticeInfo', 'LatticeInfoFactory', 'LatticeInfoArray', 'LatticeInfoView'] + _lazy_names
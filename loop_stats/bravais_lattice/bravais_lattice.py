@@ -1,12 +1,19 @@
 import numpy as np
-from tqdm import tqdm
-from typing import Tuple, Union
+from typing import Dict, Iterator, Tuple, Union
 from .typing import LatticeSize
 from .lattice_coordinates import (CoordinateTuple,
+                                  COORDINATE_DTYPE,
                                   LatticeCoordinate,
+                                  to_doubled,
                                   to_lattice_coordinate,
-                                  check_coordinate_validity)
+                                  check_coordinate_validity,
+                                  check_coordinate_validity_batch)
 from .basis_vector import BasisVector, BasisVector3D, BasisVector2D
+from .cache import LatticeCache, cache_key
+from .symmetry import point_group
+from .neighbors import NeighborShells, neighbor_shells
+from .reduction import lll_reduce, minimum_image
+from loop_stats.instrumentation import Progress, ProgressCallback, timer, count
 
 
 TOLERANCE: float = 1e-8
@@ -20,7 +27,10 @@ class BravaisLattice:
                  xy_face_centered: bool = False,
                  yz_face_centered: bool = False,
                  xz_face_centered: bool = False,
-                 show_progress: bool = True,
+                 show_progress: Union[bool, ProgressCallback] = True,
+                 cache: LatticeCache = None,
+                 lazy: bool = False,
+                 arrays: Dict[str, np.ndarray] = None,
                  **kwargs):
         if isinstance(size, int):
             size = tuple([size for _ in range(len(basis))])
@@ -39,11 +49,26 @@ class BravaisLattice:
         self._xyz = None
         self._lattice_type = None
         self._coord = None
+        self._site_table = None
+        self._point_group = None
+        self._reduction = None
+        self._periodic_cell = None
+        self._lazy = lazy
         self._params = dict(body_centered=body_centered,
                             xy_face_centered=xy_face_centered,
                             yz_face_centered=yz_face_centered,
                             xz_face_centered=xz_face_centered)
-        self.__initialize_coordinates(show_progress)
+        self._sublattice_offsets, self._sublattice_tags = self.__sublattices()
+        self._n_sublattices = len(self._sublattice_tags)
+        self._parity_lookup = self.__parity_lookup()
+        if lazy:
+            return
+        if arrays is not None:
+            self.__attach_coordinates(arrays)
+        elif cache is None:
+            self.__initialize_coordinates(show_progress)
+        else:
+            self.__load_coordinates(cache, show_progress)
 
     @property
     def ndim(self) -> int:
@@ -51,7 +76,11 @@ class BravaisLattice:
 
     @property
     def size(self) -> int:
-        return self._xyz.shape[0]
+        return int(np.prod(self._size)) * self._n_sublattices
+
+    @property
+    def lazy(self) -> bool:
+        return self._lazy
 
     @property
     def shape(self) -> LatticeSize:
@@ -71,6 +100,14 @@ class BravaisLattice:
             raise ValueError(f"Error: basis z does not exists!")
         return self._basis[2]
 
+    @property
+    def basis(self) -> Tuple[BasisVector, ...]:
+        return tuple(self._basis)
+
+    @property
+    def lattice_params(self) -> dict:
+        return dict(self._params)
+
     @property
     def body_centered(self) -> bool:
         return self._params.get('body_centered', False) if self.ndim == 3 else self.xy_face_centered
@@ -96,6 +133,18 @@ class BravaisLattice:
                                          yz_face_centered=self.yz_face_centered,
                                          xz_face_centered=self.xz_face_centered)
 
+    def check_coordinates(self, coordinates: np.ndarray, doubled: bool = False) -> np.ndarray:
+        count('lattice.validity_check.coordinates', len(coordinates))
+        with timer('lattice.validity_check'):
+            return check_coordinate_validity_batch(coordinates,
+                                                   lattice_dim=self.ndim,
+                                                   lattice_size=self.shape,
+                                                   body_centered=self.body_centered,
+                                                   xy_face_centered=self.xy_face_centered,
+                                                   yz_face_centered=self.yz_face_centered,
+                                                   xz_face_centered=self.xz_face_centered,
+                                                   doubled=doubled)
+
     def __getitem__(self, coordinate: Union[LatticeCoordinate, CoordinateTuple]) -> np.ndarray:
         coordinate = to_lattice_coordinate(coordinate)
         if self.check_coordinate(coordinate):
@@ -108,82 +157,219 @@ class BravaisLattice:
             return x.to_array()
         raise IndexError(f"Error: invalid coordinate {coordinate}!")
 
-    def __initialize_coordinates(self, show_prgress: bool = True):
-        xyz = list()
-        tags = list()
-        coordinates = list()
-        pbar = None
+    def __sublattices(self) -> Tuple[np.ndarray, np.ndarray]:
         if self.ndim == 2:
-            sx, sy = self._size
-            if show_prgress:
-                pbar = tqdm(total=sx * sy, position=0, leave=True, desc="building lattice")
-            for i in range(sx):
-                for j in range(sy):
-                    c = (i, j)
-                    xyz.append(self[c])
-                    tags.append(0)
-                    coordinates.append(c)
-                    if self.xy_face_centered:
-                        c = (i + 0.5, j + 0.5)
-                        xyz.append(self[c])
-                        tags.append(2)
-                        coordinates.append(c)
-                    if pbar:
-                        pbar.update(1)
+            offsets, tags = [(0, 0)], [0]
+            if self.xy_face_centered:
+                offsets.append((1, 1))
+                tags.append(2)
         else:
-            sx, sy, sz = self._size
-            if show_prgress:
-                pbar = tqdm(total=sx * sy, position=0, leave=True, desc="building lattice")
+            offsets, tags = [(0, 0, 0)], [0]
+            if self.body_centered:
+                offsets.append((1, 1, 1))
+                tags.append(2)
+            if self.xy_face_centered:
+                offsets.append((1, 1, 0))
+                tags.append(1)
+            if self.yz_face_centered:
+                offsets.append((0, 1, 1))
+                tags.append(1)
+            if self.xz_face_centered:
+                offsets.append((1, 0, 1))
+                tags.append(1)
+        return np.array(offsets, dtype=COORDINATE_DTYPE), np.array(tags)
+
+    def positions(self, coords: np.ndarray) -> np.ndarray:
+        coords = np.asarray(coords, dtype=float)
+        if coords.shape[-1] != self.ndim:
+            raise ValueError(f"Error: expects {self.ndim}D coordinates, received {coords.shape}!")
+        coords = coords % np.array(self._size)
+        # accumulate axis by axis, so the result is bitwise identical to __getitem__
+        xyz = coords[..., 0:1] * self._basis[0].to_array()
+        for i in range(1, self.ndim):
+            xyz = xyz + coords[..., i:i + 1] * self._basis[i].to_array()
+        return xyz
+
+    def __initialize_coordinates(self, show_progress: Union[bool, ProgressCallback] = True):
+        offsets, tags = self._sublattice_offsets, self._sublattice_tags
+        n_sub = len(tags)
+        sx = self._size[0]
+        slab = np.stack(np.meshgrid(*[np.arange(s) for s in self._size[1:]], indexing='ij'),
+                        axis=-1).reshape(-1, self.ndim - 1)
+        slab_size = slab.shape[0] * n_sub
+
+        xyz = np.zeros((sx * slab_size, self.ndim))
+        doubled = np.zeros((sx * slab_size, self.ndim), dtype=COORDINATE_DTYPE)
+        with timer('lattice.build'), Progress(sx, "building lattice", callback=show_progress) as progress:
             for i in range(sx):
-                for j in range(sy):
-                    for k in range(sz):
-                        c = (i, j, k)
-                        xyz.append(self[c])
-                        tags.append(0)
-                        coordinates.append(c)
-                        if self.body_centered:
-                            c = (i + 0.5, j + 0.5, k + 0.5)
-                            xyz.append(self[c])
-                            tags.append(2)
-                            coordinates.append(c)
-                        if self.xy_face_centered:
-                            c = (i + 0.5, j + 0.5, k)
-                            xyz.append(self[c])
-                            tags.append(1)
-                            coordinates.append(c)
-                        if self.yz_face_centered:
-                            c = (i, j + 0.5, k + 0.5)
-                            xyz.append(self[c])
-                            tags.append(1)
-                            coordinates.append(c)
-                        if self.xz_face_centered:
-                            c = (i+0.5, j, k+0.5)
-                            xyz.append(self[c])
-                            tags.append(1)
-                            coordinates.append(c)
-                        if pbar:
-                            pbar.update(1)
-        if pbar:
-            pbar.close()
-        self._xyz = np.array(xyz)
-        self._lattice_type = np.array(tags)
-        self._coord = np.array(coordinates)
+                cells = np.concatenate([np.full((slab.shape[0], 1), i), slab], axis=1)
+                c = (2 * cells[:, None, :] + offsets[None, :, :]).reshape(-1, self.ndim)
+                doubled[i * slab_size:(i + 1) * slab_size] = c
+                xyz[i * slab_size:(i + 1) * slab_size] = self.positions(c / 2)
+                progress.update(1)
+        count('lattice.build.sites', sx * slab_size)
+        self._xyz = xyz
+        self._lattice_type = np.tile(tags, sx * slab.shape[0])
+        self._coord = doubled
 
+    def __load_coordinates(self, cache: LatticeCache, show_progress: Union[bool, ProgressCallback] = True):
+        def build() -> Dict[str, np.ndarray]:
+            self.__initialize_coordinates(show_progress)
+            return dict(xyz=self._xyz, site_types=self._lattice_type, coordinate=self._coord)
+
+        self.__attach_coordinates(cache.load_or_build(self.cache_key(), build))
+
+    def __attach_coordinates(self, arrays: Dict[str, np.ndarray]):
+        if any(len(arrays[k]) != self.size for k in ('xyz', 'site_types', 'coordinate')):
+            raise ValueError(f"Error: lattice arrays do not match lattice size {self.size}!")
+        self._xyz = arrays['xyz']
+        self._lattice_type = arrays['site_types']
+        self._coord = arrays['coordinate']
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return dict(xyz=self.xyz, site_types=self.site_types, coordinate=self.doubled_coordinate)
+
+    def cache_key(self, loop_group=None, **extra) -> str:
+        return cache_key(self.basis, self.lattice_params, self.shape, loop_group, **extra)
+
+    def doubled_coordinate_at(self, indices: np.ndarray) -> np.ndarray:
+        if self._coord is not None:
+            return self._coord[indices]
+        indices = np.asarray(indices)
+        cells = np.stack(np.unravel_index(indices // self._n_sublattices, self._size), axis=-1)
+        return (2 * cells + self._sublattice_offsets[indices % self._n_sublattices]).astype(COORDINATE_DTYPE)
+
+    def xyz_at(self, indices: np.ndarray) -> np.ndarray:
+        if self._xyz is not None:
+            return self._xyz[indices]
+        return self.positions(self.doubled_coordinate_at(indices) / 2)
+
+    def site_types_at(self, indices: np.ndarray) -> np.ndarray:
+        if self._lattice_type is not None:
+            return self._lattice_type[indices]
+        return self._sublattice_tags[np.asarray(indices) % self._n_sublattices]
+
+    def iter_chunks(self, chunk_size: int = 1 << 20) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        for start in range(0, self.size, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, self.size))
+            yield (indices,
+                   self.doubled_coordinate_at(indices),
+                   self.xyz_at(indices),
+                   self.site_types_at(indices))
+
+    # lazy lattices compute the full arrays on every access and never keep them
     @property
     def xyz(self) -> np.ndarray:
         if self._xyz is None:
-            self.__initialize_coordinates()
+            return self.xyz_at(np.arange(self.size))
         return self._xyz
 
     @property
     def site_types(self) -> np.ndarray:
         if self._lattice_type is None:
-            self.__initialize_coordinates()
+            return self.site_types_at(np.arange(self.size))
         return self._lattice_type
 
     @property
-    def coordinate(self) -> np.ndarray:
+    def doubled_coordinate(self) -> np.ndarray:
         if self._coord is None:
-            self.__initialize_coordinates()
+            return self.doubled_coordinate_at(np.arange(self.size))
         return self._coord
 
+    @property
+    def coordinate(self) -> np.ndarray:
+        doubled = self.doubled_coordinate
+        if self._n_sublattices > 1:
+            return doubled / 2
+        return (doubled // 2).astype(int)
+
+    @property
+    def n_sublattices(self) -> int:
+        return self._n_sublattices
+
+    @property
+    def sublattice_offsets(self) -> np.ndarray:
+        return self._sublattice_offsets
+
+    @property
+    def point_group(self) -> np.ndarray:
+        if self._point_group is None:
+            self._point_group = point_group(self._basis, self._sublattice_offsets)
+            self._point_group.flags.writeable = False
+        return self._point_group
+
+    @property
+    def basis_matrix(self) -> np.ndarray:
+        return np.array([b.to_array() for b in self._basis], dtype=np.float64)
+
+    @property
+    def reduced_basis(self) -> Tuple[BasisVector, ...]:
+        if self._reduction is None:
+            self._reduction = lll_reduce(self.basis_matrix)
+        vector = BasisVector2D if self.ndim == 2 else BasisVector3D
+        return tuple(vector(v) for v in self._reduction[0])
+
+    @property
+    def reduction_transform(self) -> np.ndarray:
+        # reduced basis vectors are the rows of transform @ basis_matrix
+        if self._reduction is None:
+            self._reduction = lll_reduce(self.basis_matrix)
+        return self._reduction[1].copy()
+
+    @property
+    def periodic_cell(self) -> np.ndarray:
+        # the translations L_i a_i of the periodic box, reduced so minimum images are local
+        if self._periodic_cell is None:
+            cell = np.array(self._size, dtype=np.float64)[:, None] * self.basis_matrix
+            self._periodic_cell = lll_reduce(cell)[0]
+            self._periodic_cell.flags.writeable = False
+        return self._periodic_cell
+
+    def minimum_image(self, dr: np.ndarray, doubled: bool = False) -> np.ndarray:
+        if not doubled:
+            return minimum_image(dr, self.periodic_cell)
+        # doubled lattice displacements come back as doubled lattice displacements
+        vectors = self.basis_matrix
+        shortest = minimum_image((np.asarray(dr) / 2) @ vectors, self.periodic_cell)
+        return np.rint(2 * shortest @ np.linalg.inv(vectors)).astype(np.int64)
+
+    def neighbor_shells(self, k: int = 1) -> NeighborShells:
+        # shells depend on the basis and centering only, they are shared by every lattice of that kind
+        return neighbor_shells(self._basis, self._sublattice_offsets, k=k, key=cache_key(self._basis, self._params))
+
+    @property
+    def site_table(self) -> np.ndarray:
+        if self._site_table is None:
+            # sites are generated cell by cell with the sublattices innermost
+            table = np.arange(self.size, dtype=np.intp).reshape(tuple(self._size) + (self._n_sublattices,))
+            self._site_table = np.ascontiguousarray(np.moveaxis(table, -1, 0))
+        return self._site_table
+
+    def __parity_lookup(self) -> np.ndarray:
+        # parity code of a doubled coordinate -> its sublattice, -1 where no sublattice sits
+        lookup = np.full(1 << self.ndim, -1, dtype=np.intp)
+        weights = 1 << np.arange(self.ndim)
+        lookup[self._sublattice_offsets @ weights] = np.arange(self._n_sublattices)
+        lookup.flags.writeable = False
+        return lookup
+
+    @property
+    def parity_lookup(self) -> np.ndarray:
+        return self._parity_lookup
+
+    def index_of(self, coords: np.ndarray, doubled: bool = False) -> np.ndarray:
+        coords = np.asarray(coords)
+        if not doubled:
+            coords = to_doubled(coords)
+        if coords.shape[-1] != self.ndim:
+            raise ValueError(f"Error: expects {self.ndim}D coordinates, received {coords.shape}!")
+        coords = coords % (2 * np.array(self._size))
+        parity = coords & 1
+        sublattice = self._parity_lookup[parity @ (1 << np.arange(self.ndim))]
+        cells = tuple(np.moveaxis(coords >> 1, -1, 0))
+        if self._lazy:
+            index = np.ravel_multi_index(cells, self._size) * self._n_sublattices + np.maximum(sublattice, 0)
+        else:
+            index = self.site_table[(np.maximum(sublattice, 0),) + cells]
+        return np.where(sublattice >= 0, index, -1)
@@ -1,4 +1,5 @@
-from typing import Any, Tuple, Union, List
+import numpy as np
+from typing import Any, Tuple, Union, List, Sequence
 from abc import ABCMeta, abstractmethod
 from .basis_vector import BasisVector
 from .bravais_lattice import BravaisLattice, LatticeSize
@@ -10,6 +11,7 @@ CoordinateType = Union[str, CoordinateTuple, LatticeCoordinate]
 
 class LatticeInfo:
     __metaclass__ = ABCMeta
+    __slots__ = ()
 
     @abstractmethod
     def keys(self) -> List[str]:
@@ -43,6 +45,99 @@ class LatticeInfoFactory:
     def get_instance(self, **kwargs) -> LatticeInfo:
         raise NotImplemented
 
+    def keys(self) -> List[str]:
+        return self.get_instance().keys()
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.int64)
+
+
+class LatticeInfoArray:
+    def __init__(self,
+                 size: int,
+                 keys: Sequence[str],
+                 dtype: np.dtype = np.int64,
+                 ):
+        self._keys = list(keys)
+        self._columns = {k: i for i, k in enumerate(self._keys)}
+        self._data = np.zeros((size, len(self._keys)), dtype=dtype)
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data
+
+    def columns(self, attr: Union[str, Sequence[str]]) -> Union[int, List[int]]:
+        if isinstance(attr, str):
+            if attr not in self._columns:
+                raise KeyError(f"Error: unknown attribute [{attr}]!")
+            return self._columns[attr]
+        return [self.columns(a) for a in attr]
+
+    def get_attr(self, index: int, attr: str) -> Any:
+        return self._data[index, self.columns(attr)].item()
+
+    def set_attr(self, index: int, attr: str, value: Any):
+        self._data[index, self.columns(attr)] = value
+
+    def update(self, index: int, attr: str, value: Any):
+        self._data[index, self.columns(attr)] += value
+
+    def update_many(self,
+                    indices: np.ndarray,
+                    attr: Union[str, Sequence[str]],
+                    values: np.ndarray):
+        # unbuffered, so repeated indices accumulate
+        indices = np.asarray(indices)
+        columns = self.columns(attr)
+        if isinstance(columns, int):
+            np.add.at(self._data[:, columns], indices, values)
+        elif columns == list(range(len(self._keys))):
+            np.add.at(self._data, indices, np.asarray(values).reshape(len(indices), len(columns)))
+        else:
+            values = np.asarray(values).reshape(len(indices), len(columns))
+            np.add.at(self._data, (indices[:, None], np.array(columns)[None, :]), values)
+
+    def view(self, index: int) -> "LatticeInfoView":
+        return LatticeInfoView(self, index)
+
+
+class LatticeInfoView(LatticeInfo):
+    __slots__ = ['_store', '_index']
+
+    def __init__(self,
+                 store: LatticeInfoArray,
+                 index: int,
+                 ):
+        self._store = store
+        self._index = int(index)
+
+    def keys(self) -> List[str]:
+        return self._store.keys()
+
+    def get_attr(self, attr: str) -> Any:
+        return self._store.get_attr(self._index, attr)
+
+    def set_attr(self, attr: str, value: Any):
+        self._store.set_attr(self._index, attr, value)
+
+    def update(self, attr: str, value: Any):
+        self._store.update(self._index, attr, value)
+
+    def to_dict(self) -> dict:
+        return {k: self.get_attr(k) for k in self.keys()}
+
+    def load_dict(self, **kwargs):
+        for k in self.keys():
+            if k in kwargs:
+                self.set_attr(k, kwargs.get(k))
+
 
 class BravaisSystem(BravaisLattice):
     def __init__(self,
@@ -63,24 +158,37 @@ class BravaisSystem(BravaisLattice):
                                             xz_face_centered=xz_face_centered,
                                             **kwargs)
         self._factory = info_factory
-        self._info_list = dict()
+        self._info_list = LatticeInfoArray(self.size, info_factory.keys(), dtype=info_factory.dtype)
+
+    @property
+    def info_keys(self) -> List[str]:
+        return self._info_list.keys()
+
+    @property
+    def info_array(self) -> np.ndarray:
+        return self._info_list.data
+
+    def site_index(self, coord: CoordinateType) -> int:
+        coord = to_lattice_coordinate(coord)
+        index = int(self.index_of(coord.to_doubled(), doubled=True))
+        if (index < 0) or not self.check_coordinate(coord):
+            raise IndexError(f"Error: invalid coordinate {coord}!")
+        return index
 
     def info_at(self,
                 coord: CoordinateType,
-                **kwargs):
-        coord = to_lattice_coordinate(coord)
-        return self._info_list.get(coord, self._factory.get_instance(**kwargs))
+                **kwargs) -> LatticeInfo:
+        return self._info_list.view(self.site_index(coord))
 
     def info_update(self,
                     coord: CoordinateType,
                     attr: str,
                     value: Any,
                     **kwargs):
-        coord = to_lattice_coordinate(coord)
-        if coord not in self._info_list:
-            self._info_list[coord] = self._factory.get_instance(**kwargs)
-        self._info_list[coord].update(attr, value)
-
-
-
+        self._info_list.update(self.site_index(coord), attr, value)
 
+    def info_update_many(self,
+                         indices: np.ndarray,
+                         attr: Union[str, Sequence[str]],
+                         values: np.ndarray):
+        self._info_list.update_many(indices, attr, values)
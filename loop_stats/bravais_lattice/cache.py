@@ -0,0 +1,132 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import numpy as np
+from typing import Callable, Dict, List, Sequence, Union
+from .basis_vector import BasisVector
+
+
+def cache_key(basis: Sequence[Union[BasisVector, Sequence[float]]],
+              params: dict,
+              size: Sequence[int] = None,
+              loop_group: Sequence = None,
+              **extra) -> str:
+    basis = [[float(v) for v in (b.to_array() if isinstance(b, BasisVector) else b)] for b in basis]
+    content = dict(basis=[[repr(v) for v in b] for b in basis],
+                   params={k: bool(v) for k, v in sorted(params.items())},
+                   size=None if size is None else [int(s) for s in size],
+                   loops=None if loop_group is None else sorted(str(loop) for loop in loop_group),
+                   extra={k: repr(v) for k, v in sorted(extra.items())})
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class LatticeCache:
+    def __init__(self,
+                 directory: str,
+                 max_bytes: int = None,
+                 ):
+        self._directory = os.path.abspath(directory)
+        self._max_bytes = max_bytes
+        os.makedirs(self._directory, exist_ok=True)
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def max_bytes(self) -> Union[int, None]:
+        return self._max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isdir(self._path(key))
+
+    def keys(self) -> List[str]:
+        return [k for k in os.listdir(self._directory)
+                if os.path.isdir(self._path(k)) and not k.startswith('.')]
+
+    def entry_bytes(self, key: str) -> int:
+        path = self._path(key)
+        try:
+            return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.entry_bytes(k) for k in self.keys())
+
+    def store(self,
+              key: str,
+              arrays: Dict[str, np.ndarray]):
+        # write into a private directory and rename it into place, so readers never see partial entries
+        staging = os.path.join(self._directory, f'.{key}.{os.getpid()}.{uuid.uuid4().hex}')
+        os.makedirs(staging)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array))
+            os.rename(staging, self._path(key))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if key not in self:
+                raise
+        self.evict(keep=key)
+
+    def load(self, key: str) -> Union[Dict[str, np.ndarray], None]:
+        path = self._path(key)
+        try:
+            arrays = {f[:-4]: np.load(os.path.join(path, f), mmap_mode='r')
+                      for f in os.listdir(path) if f.endswith('.npy')}
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return arrays
+
+    def load_or_build(self,
+                      key: str,
+                      build: Callable[[], Dict[str, np.ndarray]],
+                      ) -> Dict[str, np.ndarray]:
+        arrays = self.load(key)
+        if arrays is None:
+            arrays = build()
+            self.store(key, arrays)
+            # another process may evict the entry before it is read back, then the built arrays are kept
+            stored = self.load(key)
+            arrays = arrays if stored is None else stored
+        return arrays
+
+    def evict(self, keep: str = None):
+        if self._max_bytes is None:
+            return
+        entries = []
+        for k in self.keys():
+            try:
+                entries.append((os.stat(self._path(k)).st_mtime, k, self.entry_bytes(k)))
+            except FileNotFoundError:
+                continue
+        total = sum(e[2] for e in entries)
+        for _, k, n_bytes in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            if k == keep:
+                continue
+            # pages of already mapped files stay valid after the unlink
+            self.remove(k)
+            total -= n_bytes
+
+    def remove(self, key: str):
+        # moved aside before it is deleted, so a reader finds the whole entry or nothing
+        trash = os.path.join(self._directory, f'.{key}.{os.getpid()}.{uuid.uuid4().hex}')
+        try:
+            os.rename(self._path(key), trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def clear(self):
+        for k in self.keys():
+            self.remove(k)
@@ -1,30 +1,75 @@
 import re
-from typing import Union, List
+import math
+import numpy as np
+from typing import Union, List, Tuple
 from abc import ABCMeta, abstractmethod
 from loop_stats.bravais_lattice.typing import CoordinateTuple, CoordinateTuple3D, CoordinateTuple2D, LatticeSize
 
 
 TOLERANCE = 1e-5
+COORDINATE_DTYPE = np.int32
+KEY_BITS: int = 21
+KEY_OFFSET: int = 1 << (KEY_BITS - 1)
+
+
+def to_doubled(coords: Union[np.ndarray, CoordinateTuple]) -> np.ndarray:
+    # rounds down to the half unit below, as OneAndHalfUnit does
+    return np.floor(np.asarray(coords, dtype=float) * 2 + 2 * TOLERANCE).astype(COORDINATE_DTYPE)
+
+
+def pack_doubled(doubled: np.ndarray) -> np.ndarray:
+    doubled = np.asarray(doubled, dtype=np.int64)
+    if doubled.shape[-1] > 3:
+        raise ValueError(f"Error: supports 2D/3D coordinates only, received {doubled.shape[-1]}D!")
+    if np.any(doubled < -KEY_OFFSET) or np.any(doubled >= KEY_OFFSET):
+        raise ValueError(f"Error: coordinate out of packable range [{-KEY_OFFSET}, {KEY_OFFSET})!")
+    keys = np.zeros(doubled.shape[:-1], dtype=np.int64)
+    for i in range(doubled.shape[-1]):
+        keys = (keys << KEY_BITS) | (doubled[..., i] + KEY_OFFSET)
+    return keys
+
+
+def unpack_doubled(keys: np.ndarray, ndim: int) -> np.ndarray:
+    keys = np.asarray(keys, dtype=np.int64)
+    mask = (1 << KEY_BITS) - 1
+    doubled = np.zeros(keys.shape + (ndim,), dtype=COORDINATE_DTYPE)
+    for i in range(ndim - 1, -1, -1):
+        doubled[..., i] = (keys & mask) - KEY_OFFSET
+        keys = keys >> KEY_BITS
+    return doubled
 
 
 class OneAndHalfUnit:
+    __slots__ = ['_d']
+
     def __init__(self,
                  unit: Union[int, float, "OneAndHalfUnit"],
                  ):
-        u_ = int(unit)
-        h_ = (unit % 1.) >= 0.5 - TOLERANCE
-        self._u = u_
-        self._h = h_
+        if isinstance(unit, OneAndHalfUnit):
+            self._d = unit._d
+        else:
+            # values between half units round down to the half unit below, within TOLERANCE
+            self._d = math.floor(2 * float(unit) + 2 * TOLERANCE)
+
+    @classmethod
+    def from_doubled(cls, doubled: int) -> "OneAndHalfUnit":
+        unit = cls.__new__(cls)
+        unit._d = int(doubled)
+        return unit
+
+    @property
+    def doubled(self) -> int:
+        return self._d
 
     @property
     def is_integer(self) -> bool:
-        return not self._h
+        return (self._d % 2) == 0
 
     def __repr__(self):
-        return f'{self._u}.5' if self._h else f'{self._u}'
+        return f'{self._d // 2}' if self.is_integer else f'{self.value}'
 
     def __int__(self) -> int:
-        return self._u
+        return int(self.value)
 
     def __float__(self) -> float:
         return self.value
@@ -33,22 +78,22 @@ class OneAndHalfUnit:
         return self.value % other
 
     def __add__(self, other) -> "OneAndHalfUnit":
-        return OneAndHalfUnit(OneAndHalfUnit(other).value + self.value)
+        return OneAndHalfUnit.from_doubled(self._d + OneAndHalfUnit(other)._d)
 
     def __mul__(self, other) -> "OneAndHalfUnit":
         return OneAndHalfUnit(float(other) * self.value)
 
     @property
     def value(self) -> float:
-        return self._u + self._h * 0.5
+        return self._d / 2
 
     def __eq__(self, other: Union["OneAndHalfUnit", float, int]):
-        other_ = OneAndHalfUnit(other)
-        return (self._u == other_._u) and (self._h == other_._h)
+        return self._d == OneAndHalfUnit(other)._d
 
 
 class LatticeCoordinate:
     __metaclass__ = ABCMeta
+    __slots__ = ()
 
     def __len__(self):
         return self.ndim
@@ -58,6 +103,11 @@ class LatticeCoordinate:
     def ndim(self) -> int:
         raise NotImplemented
 
+    @property
+    @abstractmethod
+    def doubled(self) -> Tuple[int, ...]:
+        raise NotImplemented
+
     @abstractmethod
     def __getitem__(self, item: Union[int, str]) -> OneAndHalfUnit:
         raise NotImplemented
@@ -70,12 +120,19 @@ class LatticeCoordinate:
     def __mul__(self, other: float) -> "LatticeCoordinate":
         raise NotImplemented
 
+    @property
+    def key(self) -> int:
+        key = 0
+        for d in self.doubled:
+            key = (key << KEY_BITS) | (d + KEY_OFFSET)
+        return key
+
     def to_string(self):
         m = ','.join([str(self[i]) for i in range(len(self))])
         return f'({m})'
 
     def __hash__(self):
-        return hash(self.to_string())
+        return hash(self.key)
 
     def __repr__(self):
         return self.to_string()
@@ -85,26 +142,34 @@ class LatticeCoordinate:
 
     def __eq__(self, other: Union["LatticeCoordinate", CoordinateTuple]) -> bool:
         other = to_lattice_coordinate(other)
-        if self.ndim != other.ndim:
-            return False
-        return all([self[i] == other[i] for i in range(self.ndim)])
+        return self.doubled == other.doubled
 
     def __ne__(self, other: Union["LatticeCoordinate", CoordinateTuple]) -> bool:
         return not (self == other)
 
     def to_list(self) -> List[float]:
-        return [self[i].value for i in range(len(self))]
+        return [d / 2 for d in self.doubled]
+
+    def to_doubled(self) -> np.ndarray:
+        return np.array(self.doubled, dtype=COORDINATE_DTYPE)
 
 
 class LatticeCoordinate2D(LatticeCoordinate):
+    __slots__ = ['_d']
+
     def __init__(self,
                  data: CoordinateTuple2D,
                  ):
         if len(data) != 2:
             raise ValueError(f"Error: expects 2D coordinates!")
         x, y = data
-        self._x = OneAndHalfUnit(x)
-        self._y = OneAndHalfUnit(y)
+        self._d = (OneAndHalfUnit(x).doubled, OneAndHalfUnit(y).doubled)
+
+    @classmethod
+    def from_doubled(cls, doubled: Tuple[int, int]) -> "LatticeCoordinate2D":
+        coordinate = cls.__new__(cls)
+        coordinate._d = (int(doubled[0]), int(doubled[1]))
+        return coordinate
 
     def __getitem__(self, item: Union[str, int]):
         if isinstance(item, int) and (item in [0, 1]):
@@ -118,34 +183,46 @@ class LatticeCoordinate2D(LatticeCoordinate):
 
     @property
     def x(self) -> OneAndHalfUnit:
-        return self._x
+        return OneAndHalfUnit.from_doubled(self._d[0])
 
     @property
     def y(self) -> OneAndHalfUnit:
-        return self._y
+        return OneAndHalfUnit.from_doubled(self._d[1])
 
     @property
     def ndim(self) -> int:
         return 2
 
+    @property
+    def doubled(self) -> Tuple[int, int]:
+        return self._d
+
     def __add__(self, other: Union[CoordinateTuple2D, "LatticeCoordinate2D"]) -> "LatticeCoordinate2D":
-        other_ = to_lattice_coordinate(other)
-        return LatticeCoordinate2D((self.x + other_.x, self.y + other_.y))
+        other_ = to_lattice_coordinate(other).doubled
+        if len(other_) != 2:
+            raise ValueError(f"Error: expects 2D coordinates!")
+        return LatticeCoordinate2D.from_doubled((self._d[0] + other_[0], self._d[1] + other_[1]))
 
     def __mul__(self, other: float) -> "LatticeCoordinate2D":
         return LatticeCoordinate2D((self.x * other, self.y * other))
 
 
 class LatticeCoordinate3D(LatticeCoordinate):
+    __slots__ = ['_d']
+
     def __init__(self,
                  data: CoordinateTuple3D,
                  ):
         if len(data) != 3:
             raise ValueError(f"Error: expects 3D coordinates!")
         x, y, z = data
-        self._x = OneAndHalfUnit(x)
-        self._y = OneAndHalfUnit(y)
-        self._z = OneAndHalfUnit(z)
+        self._d = (OneAndHalfUnit(x).doubled, OneAndHalfUnit(y).doubled, OneAndHalfUnit(z).doubled)
+
+    @classmethod
+    def from_doubled(cls, doubled: Tuple[int, int, int]) -> "LatticeCoordinate3D":
+        coordinate = cls.__new__(cls)
+        coordinate._d = (int(doubled[0]), int(doubled[1]), int(doubled[2]))
+        return coordinate
 
     def __getitem__(self, item: Union[str, int]):
         if isinstance(item, int) and (item in [0, 1, 2]):
@@ -161,28 +238,44 @@ class LatticeCoordinate3D(LatticeCoordinate):
 
     @property
     def x(self) -> OneAndHalfUnit:
-        return self._x
+        return OneAndHalfUnit.from_doubled(self._d[0])
 
     @property
     def y(self) -> OneAndHalfUnit:
-        return self._y
+        return OneAndHalfUnit.from_doubled(self._d[1])
 
     @property
     def z(self) -> OneAndHalfUnit:
-        return self._z
+        return OneAndHalfUnit.from_doubled(self._d[2])
 
     @property
     def ndim(self) -> int:
         return 3
 
+    @property
+    def doubled(self) -> Tuple[int, int, int]:
+        return self._d
+
     def __add__(self, other: Union[CoordinateTuple3D, "LatticeCoordinate3D"]) -> "LatticeCoordinate3D":
-        other_ = to_lattice_coordinate(other)
-        return LatticeCoordinate3D((self.x + other_.x, self.y + other_.y, self.z + other_.z))
+        other_ = to_lattice_coordinate(other).doubled
+        if len(other_) != 3:
+            raise ValueError(f"Error: expects 3D coordinates!")
+        return LatticeCoordinate3D.from_doubled((self._d[0] + other_[0],
+                                                 self._d[1] + other_[1],
+                                                 self._d[2] + other_[2]))
 
     def __mul__(self, other: float) -> "LatticeCoordinate3D":
         return LatticeCoordinate3D((self.x * other, self.y * other, self.z * other))
 
 
+def from_doubled(doubled: Union[np.ndarray, Tuple[int, ...]]) -> LatticeCoordinate:
+    if len(doubled) == 2:
+        return LatticeCoordinate2D.from_doubled(doubled)
+    elif len(doubled) == 3:
+        return LatticeCoordinate3D.from_doubled(doubled)
+    raise ValueError(f"Error: expects 2/3D tuple found {len(doubled)}!")
+
+
 def to_lattice_coordinate(x: Union[str, LatticeCoordinate, CoordinateTuple]) -> LatticeCoordinate:
     if isinstance(x, LatticeCoordinate):
         return x
@@ -229,3 +322,46 @@ def check_coordinate_validity(coordinate: Union[LatticeCoordinate, CoordinateTup
             check = check and (z_check or coordinate['z'].is_integer)
         return check
     return False
+
+
+def parity_validity_table(lattice_dim: int,
+                          body_centered: bool,
+                          xy_face_centered: bool,
+                          yz_face_centered: bool,
+                          xz_face_centered: bool,
+                          ) -> np.ndarray:
+    # bit i of a parity code is set when axis i sits on a half-integer; same rules as check_coordinate_validity
+    full = (1 << lattice_dim) - 1
+    allowed = ((1 if (xy_face_centered or xz_face_centered) else 0) |
+               (2 if (xy_face_centered or yz_face_centered) else 0) |
+               (4 if (xz_face_centered or yz_face_centered) else 0)) & full
+    codes = np.arange(1 << lattice_dim)
+    table = (codes & ~allowed) == 0
+    if body_centered:
+        table[full] = True
+    return table
+
+
+def check_coordinate_validity_batch(coordinates: np.ndarray,
+                                    lattice_dim: int,
+                                    lattice_size: LatticeSize,
+                                    body_centered: bool,
+                                    xy_face_centered: bool,
+                                    yz_face_centered: bool,
+                                    xz_face_centered: bool,
+                                    doubled: bool = False,
+                                    ) -> np.ndarray:
+    coordinates = np.asarray(coordinates)
+    if not doubled:
+        coordinates = to_doubled(coordinates)
+    if coordinates.shape[-1] != lattice_dim:
+        return np.zeros(coordinates.shape[:-1], dtype=bool)
+
+    in_range = np.all((coordinates >= 0) & (coordinates < 2 * np.array(lattice_size)), axis=-1)
+    table = parity_validity_table(lattice_dim,
+                                  body_centered=body_centered,
+                                  xy_face_centered=xy_face_centered,
+                                  yz_face_centered=yz_face_centered,
+                                  xz_face_centered=xz_face_centered)
+    parity = (coordinates & 1) @ (1 << np.arange(lattice_dim))
+    return in_range & table[parity]
@@ -0,0 +1,70 @@
+import itertools
+import numpy as np
+from typing import Dict, List, Tuple
+from .basis_vector import BasisVector
+from .lattice_coordinates import COORDINATE_DTYPE
+
+
+TOLERANCE: float = 1e-8
+NeighborShells = Tuple[np.ndarray, List[np.ndarray]]
+_SHELLS: Dict[str, NeighborShells] = dict()
+
+
+def _shells_within(vectors: np.ndarray,
+                   sublattice_offsets: np.ndarray,
+                   radius: float,
+                   tolerance: float,
+                   ) -> NeighborShells:
+    from scipy.spatial import cKDTree
+    ndim = len(vectors)
+    # |f B| >= s_min |f|, a ball of radius / s_min in lattice units holds every site within radius
+    fractional_radius = radius / np.linalg.svd(vectors, compute_uv=False).min()
+    n = 2 * int(np.ceil(fractional_radius)) + 2
+    cells = np.array(list(itertools.product(range(n), repeat=ndim)), dtype=np.int64)
+    doubled = (2 * cells[:, None, :] + sublattice_offsets[None, :, :].astype(np.int64)).reshape(-1, ndim)
+    # the periodic box is wider than the ball, so every site in it appears once, at its minimum image
+    tree = cKDTree(doubled / 2, boxsize=n)
+    found = np.array(tree.query_ball_point(np.zeros(ndim), fractional_radius * (1 + tolerance)), dtype=np.intp)
+    offsets = (doubled[found] + n) % (2 * n) - n
+    offsets = offsets[np.any(offsets != 0, axis=1)]
+    distances = np.linalg.norm((offsets / 2) @ vectors, axis=1)
+    keep = distances <= radius * (1 + tolerance)
+    offsets, distances = offsets[keep], distances[keep]
+
+    if len(offsets) == 0:
+        return np.zeros(0), []
+
+    # by distance, then lexicographic inside a shell
+    order = np.lexsort(tuple(offsets.T[::-1]) + (distances,))
+    offsets, distances = offsets[order], distances[order]
+    boundaries = np.flatnonzero(np.diff(distances) > tolerance * max(1., distances.max())) + 1
+    starts = np.concatenate([[0], boundaries]).astype(np.intp)
+    return distances[starts], np.split(offsets.astype(COORDINATE_DTYPE), boundaries)
+
+
+def neighbor_shells(basis: Tuple[BasisVector, ...],
+                    sublattice_offsets: np.ndarray,
+                    k: int = 1,
+                    key: str = None,
+                    tolerance: float = TOLERANCE,
+                    ) -> NeighborShells:
+    if k < 1:
+        raise ValueError(f"Error: expects at least one shell, received k={k}!")
+    if (key is not None) and (key in _SHELLS) and (len(_SHELLS[key][0]) >= k):
+        distances, shells = _SHELLS[key]
+        return distances[:k], shells[:k]
+
+    vectors = np.array([b.to_array() for b in basis], dtype=np.float64)
+    radius = np.linalg.norm(vectors, axis=1).min()
+    while True:
+        distances, shells = _shells_within(vectors, np.asarray(sublattice_offsets), radius, tolerance)
+        # every shell inside the radius is complete, grow the radius until it holds k of them
+        if len(distances) >= k:
+            break
+        radius *= 2
+    for shell in shells:
+        shell.flags.writeable = False
+    distances.flags.writeable = False
+    if key is not None:
+        _SHELLS[key] = (distances, shells)
+    return distances[:k], shells[:k]
@@ -1,6 +1,5 @@
 import numpy as np
 from typing import Tuple
-import matplotlib.pyplot as plt
 from .bravais_lattice import BravaisLattice
 
 
@@ -9,6 +8,8 @@ def plot_lattice_grid(lattice: BravaisLattice,
                       figure_size: Tuple[float, float] = (10, 10),
                       to_plot: bool = True,
                       ):
+    # pyplot takes longer to import than the rest of the package, only plotting pays for it
+    import matplotlib.pyplot as plt
     xyz, coordinate_type = lattice.xyz, lattice.site_types
     unique_types = np.unique(coordinate_type)
     if (color_map is None) or (len(unique_types) != len(color_map)):
@@ -0,0 +1,72 @@
+import itertools
+import numpy as np
+from typing import Tuple
+
+
+LLL_DELTA: float = 0.99
+CHUNK_SIZE: int = 1 << 16
+
+
+def _gram_schmidt(basis: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(basis)
+    ortho, mu = np.zeros_like(basis), np.zeros((n, n))
+    for i in range(n):
+        ortho[i] = basis[i]
+        for j in range(i):
+            mu[i, j] = basis[i] @ ortho[j] / (ortho[j] @ ortho[j])
+            ortho[i] = ortho[i] - mu[i, j] * ortho[j]
+    return ortho, mu
+
+
+def lll_reduce(vectors: np.ndarray, delta: float = LLL_DELTA) -> Tuple[np.ndarray, np.ndarray]:
+    # rows are basis vectors, returns the reduced rows and the unimodular T with reduced = T @ vectors
+    basis = np.array(vectors, dtype=np.float64)
+    n = len(basis)
+    transform = np.eye(n, dtype=np.int64)
+
+    ortho, mu = _gram_schmidt(basis)
+    k = 1
+    while k < n:
+        for j in range(k - 1, -1, -1):
+            q = int(np.rint(mu[k, j]))
+            if q != 0:
+                basis[k] -= q * basis[j]
+                transform[k] -= q * transform[j]
+                ortho, mu = _gram_schmidt(basis)
+        # Lovasz condition, swap when the projected vector k is much shorter than vector k - 1
+        if ortho[k] @ ortho[k] >= (delta - mu[k, k - 1] ** 2) * (ortho[k - 1] @ ortho[k - 1]):
+            k += 1
+        else:
+            basis[[k - 1, k]] = basis[[k, k - 1]]
+            transform[[k - 1, k]] = transform[[k, k - 1]]
+            ortho, mu = _gram_schmidt(basis)
+            k = max(k - 1, 1)
+
+    # keep the handedness of the input basis
+    if np.linalg.det(transform) < 0:
+        basis[-1], transform[-1] = -basis[-1], -transform[-1]
+    return basis, transform
+
+
+def minimum_image(dr: np.ndarray,
+                  cell: np.ndarray,
+                  chunk_size: int = CHUNK_SIZE,
+                  ) -> np.ndarray:
+    # cell rows are the periodic translations and should be reduced, then the shortest image of a
+    # displacement is its wrapped image shifted by at most one translation along every axis
+    dr = np.asarray(dr, dtype=np.float64)
+    shape, ndim = dr.shape, cell.shape[0]
+    if shape[-1] != ndim:
+        raise ValueError(f"Error: expects {ndim}D displacements, received {shape}!")
+    dr = dr.reshape(-1, ndim)
+    inverse = np.linalg.inv(cell)
+    shifts = np.array(list(itertools.product((-1, 0, 1), repeat=ndim)), dtype=np.float64) @ cell
+    lengths = np.einsum('si,si->s', shifts, shifts)
+    result = np.empty_like(dr)
+    for start in range(0, len(dr), chunk_size):
+        fractional = dr[start:start + chunk_size] @ inverse
+        wrapped = (fractional - np.rint(fractional)) @ cell
+        # |w + s|^2 - |w|^2 = 2 w.s + |s|^2, one product ranks every image of the chunk
+        best = np.argmin(2 * (wrapped @ shifts.T) + lengths, axis=1)
+        result[start:start + chunk_size] = wrapped + shifts[best]
+    return result.reshape(shape)
@@ -0,0 +1,56 @@
+import itertools
+import numpy as np
+from typing import Dict, Tuple, Union
+from .basis_vector import BasisVector
+from .bravais_basis import BravaisLatticeType, get_basis_pair, to_bravais_lattice_type
+
+
+TOLERANCE: float = 1e-8
+_CANDIDATES: Dict[int, np.ndarray] = dict()
+
+
+def _candidates(ndim: int) -> np.ndarray:
+    # the point group of a reduced basis maps each basis vector to a sum of at most a few others,
+    # entries from {-1, 0, 1} cover the holohedry of every lattice get_basis_pair builds
+    if ndim not in _CANDIDATES:
+        matrices = np.array(list(itertools.product((-1, 0, 1), repeat=ndim * ndim)), dtype=np.int64)
+        matrices = matrices.reshape(-1, ndim, ndim)
+        _CANDIDATES[ndim] = matrices[np.abs(np.round(np.linalg.det(matrices))) == 1]
+    return _CANDIDATES[ndim]
+
+
+def point_group(basis: Tuple[BasisVector, ...],
+                sublattice_offsets: np.ndarray = None,
+                tolerance: float = TOLERANCE,
+                ) -> np.ndarray:
+    vectors = np.array([b.to_array() for b in basis], dtype=np.float64)
+    ndim = len(vectors)
+    if ndim not in (2, 3):
+        raise ValueError(f"Error: supports 2D/3D lattices only!")
+    # an operation acts on lattice coordinates, c -> M c, it is a symmetry when it keeps the metric
+    metric = vectors @ vectors.T
+    matrices = _candidates(ndim)
+    images = np.einsum('nji,jk,nkl->nil', matrices, metric, matrices)
+    keep = np.all(np.abs(images - metric) <= tolerance * max(1., np.abs(metric).max()), axis=(1, 2))
+    matrices = matrices[keep]
+
+    # and maps the centering parities of the doubled coordinates onto themselves
+    if (sublattice_offsets is not None) and (len(sublattice_offsets) > 1):
+        offsets = np.asarray(sublattice_offsets, dtype=np.int64) % 2
+        weights = 1 << np.arange(ndim)
+        allowed = np.zeros(1 << ndim, dtype=bool)
+        allowed[offsets @ weights] = True
+        mapped = np.einsum('nij,sj->nsi', matrices, offsets) % 2
+        matrices = matrices[np.all(allowed[mapped @ weights], axis=1)]
+
+    # identity first, the rest in the enumeration order
+    identity = np.all(matrices == np.eye(ndim, dtype=np.int64), axis=(1, 2))
+    order = np.argsort(~identity, kind='stable')
+    return matrices[order].astype(np.int32)
+
+
+def lattice_point_group(lattice_type: Union[BravaisLatticeType, str], **kwargs) -> np.ndarray:
+    from .bravais_lattice import BravaisLattice
+    basis, params = get_basis_pair(to_bravais_lattice_type(lattice_type), **kwargs)
+    lattice = BravaisLattice(basis, size=1, lazy=True, **params)
+    return lattice.point_group
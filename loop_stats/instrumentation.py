@@ -0,0 +1,194 @@
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Union
+
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class TqdmProgress:
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._bar = None
+        self._shown = 0
+
+    def __call__(self, done: int, total: int, description: str):
+        if self._bar is None:
+            from tqdm import tqdm
+            self._bar = tqdm(total=total, desc=description, **self._kwargs)
+        self._bar.update(done - self._shown)
+        self._shown = done
+        if done >= total:
+            self._bar.close()
+            self._bar, self._shown = None, 0
+
+
+class LogProgress:
+    def __init__(self, stream=None):
+        self._stream = stream
+
+    def __call__(self, done: int, total: int, description: str):
+        stream = self._stream if self._stream is not None else sys.stderr
+        stream.write(f"{description}: {done}/{total} ({100. * done / max(total, 1):.1f}%)\n")
+        stream.flush()
+
+
+def resolve_progress(progress: Union[bool, ProgressCallback, None]) -> Union[ProgressCallback, None]:
+    if progress is True:
+        # a redirected stderr gets plain lines instead of bar redraws
+        if sys.stderr.isatty():
+            return TqdmProgress(position=0, leave=True)
+        return LogProgress()
+    if (progress is False) or (progress is None):
+        return None
+    if not callable(progress):
+        raise ValueError(f"Error: progress must be a bool or a callable (done, total, description)!")
+    return progress
+
+
+class Progress:
+    def __init__(self,
+                 total: int,
+                 description: str = '',
+                 callback: Union[bool, ProgressCallback, None] = None,
+                 every: int = None,
+                 interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 ):
+        self._total = total
+        self._description = description
+        self._callback = resolve_progress(callback)
+        self._every = every if every is not None else max(1, total // 100)
+        self._interval = interval
+        self._clock = clock
+        self._done = 0
+        self._reported = 0
+        self._last = clock()
+
+    @property
+    def done(self) -> int:
+        return self._done
+
+    def update(self, n: int = 1):
+        self._done += n
+        if self._callback is None:
+            return
+        # the callback runs at most once per `interval` seconds and `every` items, and always on completion
+        if self._done >= self._total:
+            self.flush()
+        elif (self._done - self._reported >= self._every) and (self._clock() - self._last >= self._interval):
+            self.flush()
+
+    def flush(self):
+        if (self._callback is not None) and (self._done != self._reported):
+            self._callback(self._done, self._total, self._description)
+            self._reported = self._done
+            self._last = self._clock()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = True):
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._timers: Dict[str, list] = dict()
+        self._counters: Dict[str, int] = dict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self._enabled = bool(value)
+
+    def record(self, name: str, seconds: float, calls: int = 1):
+        if not self._enabled:
+            return
+        # a batch of calls timed together only reveals its mean, the largest batch mean is kept
+        with self._lock:
+            entry = self._timers.setdefault(name, [0, 0., 0.])
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds / max(calls, 1))
+
+    def count(self, name: str, n: int = 1):
+        if self._enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + int(n)
+
+    @contextmanager
+    def timer(self, name: str):
+        if not self._enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        def decorate(func: Callable):
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__wrapped__ = func
+            return wrapper
+        return decorate
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return dict(timers={k: dict(calls=v[0], seconds=v[1], max_mean_seconds=v[2])
+                                for k, v in sorted(self._timers.items())},
+                        counters=dict(sorted(self._counters.items())))
+
+    def merge(self, other: Union["Instrumentation", dict]):
+        other = other.to_dict() if isinstance(other, Instrumentation) else other
+        with self._lock:
+            for name, timer in other.get('timers', dict()).items():
+                entry = self._timers.setdefault(name, [0, 0., 0.])
+                entry[0] += timer['calls']
+                entry[1] += timer['seconds']
+                entry[2] = max(entry[2], timer['max_mean_seconds'])
+            for name, n in other.get('counters', dict()).items():
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def dump(self, path: str = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+
+INSTRUMENTATION = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return INSTRUMENTATION
+
+
+def timer(name: str):
+    return INSTRUMENTATION.timer(name)
+
+
+def count(name: str, n: int = 1):
+    INSTRUMENTATION.count(name, n)
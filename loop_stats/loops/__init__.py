@@ -1,7 +1,42 @@
+from loop_stats._lazy import lazy_module
 from .defects import FundamentalLoopDefect
 from .defects import (validate_closed_cycle,
                       validate_minimum_length,
                       validate_same_dimension_offsets,
                       validate_loop_defect)
-from .defects import anti_cycle, generate_defect_coordinates
+from .defects import anti_cycle, generate_defect_coordinates, group_stencil, overlap_stencil
+from .defects import canonical_stencil, orbit_key, orbit_size
+from .registry import LoopRegistry
 
+from .observables import (Accumulator,
+                          Welford,
+                          BinningAnalysis,
+                          AutocorrelationEstimator,
+                          Histogram,
+                          accumulator_from_state,
+                          merge_all,
+                          pack_states,
+                          unpack_states)
+
+# cluster and correlation analysis pull in the simulator package, enumeration a process pool,
+# they are loaded on first use
+__getattr__, _lazy_names = lazy_module(__name__, dict(LoopLibrary='.enumeration',
+                                                      enumerate_loops='.enumeration',
+                                                      nearest_neighbor_steps='.enumeration',
+                                                      occupied_loops='.clusters',
+                                                      loop_bonds='.clusters',
+                                                      label_clusters='.clusters',
+                                                      cluster_windings='.clusters',
+                                                      cluster_loop_counts='.clusters',
+                                                      size_histogram='.clusters',
+                                                      CorrelationAnalysis='.correlation',
+                                                      defect_density='.correlation',
+                                                      radial_average='.correlation',
+                                                      second_moment_length='.correlation'))
+
+__all__ = ['FundamentalLoopDefect', 'validate_closed_cycle', 'validate_minimum_length',
+           'validate_same_dimension_offsets', 'validate_loop_defect', 'anti_cycle',
+           'generate_defect_coordinates', 'group_stencil', 'overlap_stencil', 'canonical_stencil',
+           'orbit_key', 'orbit_size', 'LoopRegistry', 'Accumulator', 'Welford', 'BinningAnalysis',
+           'AutocorrelationEstimator', 'Histogram', 'accumulator_from_state', 'merge_all', 'pack_states',
+           'unpack_states'] + _lazy_names
@@ -0,0 +1,133 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import Tuple
+from scipy.sparse.csgraph import connected_components
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+
+
+def occupied_loops(system: BravaisLatticeWithLoopDefects) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    anchors, loop_id = np.nonzero(system.loop_occupancy > 0)
+    return anchors, loop_id, system.loop_occupancy[anchors, loop_id]
+
+
+def loop_bonds(system: BravaisLatticeWithLoopDefects,
+               displacements: bool = False,
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    anchors, loop_id, _ = occupied_loops(system)
+    heads, tails, steps = [], [], []
+    for i in np.unique(loop_id):
+        # a loop anchored at s visits s + p_0, s + p_1, ... and its step o_i closes bond i onto vertex i + 1
+        loop = system.registered_loop(int(i))
+        path = loop.path.astype(np.int64)
+        start = system.doubled_coordinate_at(anchors[loop_id == i]).astype(np.int64)
+        sites = system.index_of(start[:, None, :] + path[None, :, :], doubled=True)
+        heads.append(sites.ravel())
+        tails.append(np.roll(sites, -1, axis=1).ravel())
+        if displacements:
+            steps.append(np.tile(loop.stencil.astype(np.int64), (len(sites), 1)))
+    steps = np.concatenate(steps) if len(steps) > 0 else np.zeros((0, system.ndim), dtype=np.int64)
+    if len(heads) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), steps
+    return np.concatenate(heads), np.concatenate(tails), steps
+
+
+def _bond_graph(system: BravaisLatticeWithLoopDefects,
+                displacements: bool = False,
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    heads, tails, steps = loop_bonds(system, displacements=displacements)
+    # only the sites some loop passes through are labeled, every tail is also the head of the next bond
+    active = np.zeros(system.size, dtype=bool)
+    active[heads] = True
+    compact = np.cumsum(active) - 1
+    return np.flatnonzero(active), compact[heads], compact[tails], steps
+
+
+def _components(n: int, heads: np.ndarray, tails: np.ndarray) -> np.ndarray:
+    graph = sp.csr_matrix((np.ones(len(heads), dtype=np.int8), (heads, tails)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def label_clusters(system: BravaisLatticeWithLoopDefects) -> Tuple[np.ndarray, np.ndarray]:
+    active, heads, tails, _ = _bond_graph(system)
+    labels = np.full(system.size, -1, dtype=np.int64)
+    components = _components(len(active), heads, tails)
+    labels[active] = components
+    return labels, np.bincount(components).astype(np.int64)
+
+
+def _unwrapped_components(n: int,
+                          heads: np.ndarray,
+                          tails: np.ndarray,
+                          steps: np.ndarray,
+                          ) -> Tuple[np.ndarray, np.ndarray]:
+    # union-find that carries displacements: offset[v] is the position of v relative to parent[v], a root
+    # is hooked under the smallest root it shares a bond with, then pointers jump until every site
+    # points at its root; roots are the lowest site of their cluster, so labels come out ordered like
+    # connected_components
+    sources, targets = np.concatenate([heads, tails]), np.concatenate([tails, heads])
+    moves = np.concatenate([steps, -steps])
+    parent = np.arange(n)
+    offset = np.zeros((n, steps.shape[1]), dtype=np.int64)
+    while True:
+        low, high = parent[sources], parent[targets]
+        crossing = np.flatnonzero(low < high)
+        if len(crossing) == 0:
+            break
+        crossing = crossing[np.lexsort((low[crossing], high[crossing]))]
+        first = crossing[np.concatenate([[True], np.diff(high[crossing]) != 0])]
+        # position of the hooked root relative to its new parent, along bond source -> target
+        offset[high[first]] = offset[sources[first]] + moves[first] - offset[targets[first]]
+        parent[high[first]] = low[first]
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            offset += offset[parent]
+            parent = grand
+    return np.unique(parent, return_inverse=True)[1], offset
+
+
+def cluster_windings(system: BravaisLatticeWithLoopDefects,
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    active, heads, tails, steps = _bond_graph(system, displacements=True)
+    # one pass labels the clusters and unwraps the positions of their sites
+    components, positions = _unwrapped_components(len(active), heads, tails, steps)
+    labels = np.full(system.size, -1, dtype=np.int64)
+    labels[active] = components
+    n_clusters = int(components.max(initial=-1)) + 1
+
+    # a bond closing a cycle through the periodic boundary disagrees with the unwrapped positions by a
+    # whole number of periods, tree bonds agree exactly; the gcd over the bonds of a cluster does not
+    # depend on the spanning tree the positions were unwrapped along
+    period = 2 * np.array(system.shape, dtype=np.int64)
+    windings = np.abs(positions[heads] + steps - positions[tails]) // period
+    clusters = components[heads]
+    winding = np.zeros((system.ndim, n_clusters), dtype=np.int64)
+    low = np.full((system.ndim, n_clusters), np.iinfo(np.int64).max)
+    high = np.full((system.ndim, n_clusters), np.iinfo(np.int64).min)
+    for axis in range(system.ndim):
+        np.gcd.at(winding[axis], clusters, windings[:, axis])
+        np.minimum.at(low[axis], components, positions[:, axis])
+        np.maximum.at(high[axis], components, positions[:, axis])
+    # a cluster spans an axis when it winds around it or its unwrapped extent covers every cell layer
+    spans = (winding > 0) | (high - low >= period[:, None] - 2)
+    winding, spans = winding.T, spans.T
+    return labels, np.bincount(components, minlength=n_clusters).astype(np.int64), winding, spans
+
+
+def cluster_loop_counts(system: BravaisLatticeWithLoopDefects, labels: np.ndarray) -> np.ndarray:
+    anchors, loop_id, counts = occupied_loops(system)
+    n_clusters = int(labels.max(initial=-1)) + 1
+    if len(anchors) == 0:
+        return np.zeros(n_clusters, dtype=np.int64)
+    start = system.doubled_coordinate_at(anchors).astype(np.int64)
+    first = np.array([system.registered_loop(int(i)).path[0] for i in range(system.known_loop_count)])
+    sites = system.index_of(start + first[loop_id], doubled=True)
+    return np.bincount(labels[sites], weights=counts, minlength=n_clusters).astype(np.int64)
+
+
+def size_histogram(sizes: np.ndarray, max_size: int = None) -> np.ndarray:
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if max_size is None:
+        max_size = int(sizes.max(initial=0))
+    return np.bincount(np.minimum(sizes, max_size), minlength=max_size + 1)
@@ -0,0 +1,194 @@
+import numpy as np
+from typing import Dict, Tuple
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+
+
+def defect_density(system: BravaisLatticeWithLoopDefects) -> np.ndarray:
+    return np.any(system.defect_field != 0, axis=1).astype(np.float64)
+
+
+def radial_average(distances: np.ndarray,
+                   values: np.ndarray,
+                   bin_width: float,
+                   weights: np.ndarray = None,
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    bins = np.rint(np.asarray(distances).ravel() / bin_width).astype(np.intp)
+    weights = np.ones(len(bins)) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+    counts = np.bincount(bins, weights=weights)
+    totals = np.bincount(bins, weights=weights * np.asarray(values, dtype=np.float64).ravel())
+    keep = counts > 0
+    return np.flatnonzero(keep) * bin_width, totals[keep] / counts[keep], counts[keep]
+
+
+def second_moment_length(s_zero: float, s_min: float, k_min: float) -> float:
+    # S(k) ~ S(0) / (1 + xi^2 k^2) at small k
+    if s_min <= 0:
+        return np.inf
+    return float(np.sqrt(max(s_zero / s_min - 1., 0.)) / k_min)
+
+
+class CorrelationAnalysis:
+    def __init__(self,
+                 lattice: BravaisLattice,
+                 bin_width: float = None,
+                 tolerance: float = 1e-8,
+                 ):
+        self._lattice = lattice
+        self._shape = tuple(int(s) for s in lattice.shape)
+        self._ndim = lattice.ndim
+        self._offsets = lattice.sublattice_offsets.astype(np.int64)
+        self._tolerance = tolerance
+        if bin_width is None:
+            bin_width = float(lattice.neighbor_shells(1)[0][0]) / 4
+        self._bin_width = bin_width
+        self._k_norm = None
+        self._groups = None
+        self._distance_bins: Dict[Tuple[int, ...], np.ndarray] = dict()
+
+    @property
+    def lattice(self) -> BravaisLattice:
+        return self._lattice
+
+    @property
+    def bin_width(self) -> float:
+        return self._bin_width
+
+    @property
+    def spectrum_shape(self) -> Tuple[int, ...]:
+        # the real transform keeps half of the last axis, S(-k) = S(k) holds the rest
+        return self._shape[:-1] + (self._shape[-1] // 2 + 1,)
+
+    def grids(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[0] != self._lattice.size:
+            raise ValueError(f"Error: expects one value per site [{values.shape[0]} != {self._lattice.size}]!")
+        if values.ndim == 1:
+            values = values[:, None]
+        # (n_sublattices, sx, sy[, sz], n_components)
+        return values[self._lattice.site_table]
+
+    def __frequencies(self) -> list:
+        frequencies = [np.fft.fftfreq(n) for n in self._shape[:-1]] + [np.fft.rfftfreq(self._shape[-1])]
+        return np.meshgrid(*frequencies, indexing='ij', sparse=True)
+
+    def __phase(self, sublattice: int) -> np.ndarray:
+        # a site of sublattice s in cell c sits at c + o_s / 2, its plane wave picks up exp(-i k.o_s / 2)
+        phase = 1.
+        for axis, f in enumerate(self.__frequencies()):
+            phase = phase * np.exp(-1j * np.pi * f * self._offsets[sublattice, axis])
+        return phase
+
+    @property
+    def wavevector_norms(self) -> np.ndarray:
+        if self._k_norm is None:
+            # k.r = 2 pi (m / L).c with r = c B, so k = 2 pi B^-1 (m / L)
+            inverse = np.linalg.inv(self._lattice.basis_matrix)
+            frequencies = self.__frequencies()
+            k = [2 * np.pi * sum(inverse[i, j] * frequencies[j] for j in range(self._ndim)) for i in range(self._ndim)]
+            self._k_norm = np.sqrt(sum(component ** 2 for component in k))
+        return self._k_norm
+
+    @property
+    def spectrum_weights(self) -> np.ndarray:
+        # points of the half spectrum that stand in for their mirror image count twice
+        n = self._shape[-1]
+        weights = np.full(self.spectrum_shape[-1], 2.)
+        weights[0] = 1.
+        if n % 2 == 0:
+            weights[-1] = 1.
+        return np.broadcast_to(weights, self.spectrum_shape)
+
+    @property
+    def k_min(self) -> float:
+        k = self.wavevector_norms
+        return float(k[k > self._tolerance].min())
+
+    def structure_factor(self, values: np.ndarray, subtract_mean: bool = True) -> np.ndarray:
+        grids = self.grids(values)
+        if subtract_mean:
+            grids = grids - grids.mean(axis=tuple(range(grids.ndim - 1)))
+        rho = 0.
+        for s in range(len(grids)):
+            rho = rho + self.__phase(s)[..., None] * np.fft.rfftn(grids[s], axes=tuple(range(self._ndim)))
+        return (np.abs(rho) ** 2).sum(axis=-1) / self._lattice.size
+
+    def radial_structure_factor(self,
+                                values: np.ndarray,
+                                subtract_mean: bool = True,
+                                bin_width: float = None,
+                                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return radial_average(self.wavevector_norms * np.ones(self.spectrum_shape),
+                              self.structure_factor(values, subtract_mean=subtract_mean),
+                              self.k_min if bin_width is None else bin_width,
+                              weights=self.spectrum_weights)
+
+    def correlation_length(self, structure_factor: np.ndarray) -> float:
+        # S(k) may be averaged over many configurations before it comes here; S(0) holds the Bragg peak
+        # N <v>^2 of a field with a nonzero mean, or nothing once the mean is subtracted, so it is never
+        # read and 1 / S(k) = (1 + xi^2 k^2) / S(0) is extrapolated to k = 0 from the two smallest shells
+        k = self.wavevector_norms * np.ones(self.spectrum_shape)
+        shells = np.sort(k[k > self._tolerance])
+        k_one = float(shells[0])
+        beyond = shells[shells > k_one + self._tolerance * max(1., k_one)]
+        if len(beyond) == 0:
+            raise ValueError(f"Error: the correlation length needs two shells of nonzero wave vectors!")
+        k_two = float(beyond[0])
+        s_one, s_two = [float(structure_factor[np.abs(k - q) <= self._tolerance * max(1., q)].mean())
+                        for q in (k_one, k_two)]
+        if (s_one <= 0) or (s_two <= 0):
+            return np.inf
+        slope = (1. / s_two - 1. / s_one) / (k_two ** 2 - k_one ** 2)
+        intercept = 1. / s_one - slope * k_one ** 2
+        if intercept <= 0:
+            return np.inf
+        return second_moment_length(1. / intercept, s_one, k_one)
+
+    def __pair_groups(self) -> Dict[Tuple[int, ...], list]:
+        # sublattice pairs that are the same offset apart share their distance grid
+        if self._groups is None:
+            self._groups = dict()
+            for s in range(len(self._offsets)):
+                for t in range(len(self._offsets)):
+                    delta = tuple((self._offsets[t] - self._offsets[s]).tolist())
+                    self._groups.setdefault(delta, []).append((s, t))
+        return self._groups
+
+    def __distance_bins(self, delta: Tuple[int, ...]) -> np.ndarray:
+        mirror = tuple(-d for d in delta)
+        if (delta not in self._distance_bins) and (mirror in self._distance_bins):
+            # the displacement 2c + delta is minus the displacement -2c - delta, read at -c modulo L
+            bins = self._distance_bins[mirror].reshape(self._shape)
+            for axis in range(self._ndim):
+                bins = np.roll(np.flip(bins, axis=axis), 1, axis=axis)
+            self._distance_bins[delta] = np.ascontiguousarray(bins).ravel()
+        if delta not in self._distance_bins:
+            cells = np.stack(np.meshgrid(*[np.arange(n) for n in self._shape], indexing='ij'), axis=-1)
+            doubled = (2 * cells + np.array(delta)).reshape(-1, self._ndim)
+            dr = self._lattice.minimum_image((doubled / 2) @ self._lattice.basis_matrix)
+            bins = np.rint(np.sqrt(np.einsum('ni,ni->n', dr, dr)) / self._bin_width)
+            self._distance_bins[delta] = bins.astype(np.int32)
+        return self._distance_bins[delta]
+
+    def pair_correlation(self,
+                         values: np.ndarray,
+                         subtract_mean: bool = True,
+                         ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        grids = self.grids(values)
+        if subtract_mean:
+            grids = grids - grids.mean(axis=tuple(range(grids.ndim - 1)))
+        spatial = tuple(range(self._ndim))
+        transforms = [np.fft.rfftn(grid, axes=spatial) for grid in grids]
+        totals, counts = np.zeros(0), np.zeros(0)
+        for delta, pairs in self.__pair_groups().items():
+            # sum_c v_s(c) v_t(c + d) for every cell displacement d at once, summed over the pairs
+            product = sum((np.conj(transforms[s]) * transforms[t]).sum(axis=-1) for s, t in pairs)
+            correlation = np.fft.irfftn(product, s=self._shape, axes=spatial).ravel()
+            bins = self.__distance_bins(delta)
+            size = max(len(totals), int(bins.max()) + 1)
+            totals = np.pad(totals, (0, size - len(totals))) + np.bincount(bins, weights=correlation, minlength=size)
+            counts = np.pad(counts, (0, size - len(counts))) + np.bincount(bins, minlength=size) * len(pairs)
+        keep = counts > 0
+        n_cells = int(np.prod(self._shape))
+        # the average of v_i . v_j over the pairs of sites at each distance
+        return np.flatnonzero(keep) * self._bin_width, totals[keep] / (counts[keep] * n_cells), counts[keep] * n_cells
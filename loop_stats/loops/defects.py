@@ -1,8 +1,9 @@
 import numpy as np
-from typing import List, Union
+from typing import List, Tuple, Union
 from loop_stats.bravais_lattice.typing import CoordinateTuple, LatticeSize
 from loop_stats.bravais_lattice import LatticeCoordinate
-from loop_stats.bravais_lattice import to_lattice_coordinate
+from loop_stats.bravais_lattice import to_lattice_coordinate, from_doubled
+from loop_stats.bravais_lattice.lattice_coordinates import COORDINATE_DTYPE
 
 
 def validate_minimum_length(offsets: List[LatticeCoordinate]) -> bool:
@@ -45,6 +46,40 @@ def validate_loop_defect(offsets: List[LatticeCoordinate]):
             validate_unique_cycle(offsets))
 
 
+def canonical_stencil(stencil: np.ndarray) -> Tuple[int, ...]:
+    # a cyclic shift of the steps moves the vertices of a loop anchored at s by -path[k], it touches
+    # other sites; only identical stencils touch the same sites in the same order, so the stencil itself
+    # identifies the loop and loops equal up to translation share the orbit_key instead
+    stencil = np.asarray(stencil).reshape(len(stencil), -1)
+    # the dimension leads so loops of different dimension never share a form
+    return (stencil.shape[1],) + tuple(int(x) for x in stencil.ravel())
+
+
+def _canonical_rows(stencil: np.ndarray, point_group: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # every cyclic shift of every image of the stencil and of its reversed traversal (reversed order,
+    # negated steps), flattened and sorted; image g and its reversal are g and g + len(point_group)
+    n, ndim = stencil.shape
+    images = np.einsum('gij,sj->gsi', point_group, stencil)
+    images = np.concatenate([images, -images[:, ::-1]])
+    shifts = (np.arange(n)[:, None] + np.arange(n)[None, :]) % n
+    rows = images[:, shifts].reshape(len(images) * n, n * ndim)
+    return rows, np.lexsort(rows.T[::-1])
+
+
+def orbit_key(stencil: np.ndarray, point_group: np.ndarray) -> Tuple[int, ...]:
+    # loops are keyed without orientation, a loop and its anti_cycle share the key
+    rows, order = _canonical_rows(np.asarray(stencil, dtype=np.int64), np.asarray(point_group, dtype=np.int64))
+    return (stencil.shape[1],) + tuple(int(x) for x in rows[order[0]])
+
+
+def orbit_size(stencil: np.ndarray, point_group: np.ndarray) -> int:
+    n = len(stencil)
+    rows, order = _canonical_rows(np.asarray(stencil, dtype=np.int64), np.asarray(point_group, dtype=np.int64))
+    # the first row of each operation in sorted order is the unoriented canonical form of that image
+    _, first = np.unique((order // n) % len(point_group), return_index=True)
+    return len(np.unique(rows[order[first]], axis=0))
+
+
 class FundamentalLoopDefect:
     def __init__(self,
                  offsets: List[LatticeCoordinate],
@@ -53,11 +88,54 @@ class FundamentalLoopDefect:
         if not validate_loop_defect(offsets):
             raise ValueError(f"Error: incomplete loop definition!")
         self._offsets = offsets
+        self._stencil = np.array([off.doubled for off in offsets], dtype=COORDINATE_DTYPE)
+        self._stencil.flags.writeable = False
+        # the offsets are the steps of a closed walk, vertex i sits at the sum of the steps before it
+        self._path = np.concatenate([np.zeros((1, self._stencil.shape[1]), dtype=COORDINATE_DTYPE),
+                                     np.cumsum(self._stencil, axis=0, dtype=COORDINATE_DTYPE)[:-1]])
+        self._path.flags.writeable = False
+        self._canonical = canonical_stencil(self._stencil)
+        self._unoriented = None
+        self._hash = hash(self._canonical)
+
+    @property
+    def stencil(self) -> np.ndarray:
+        return self._stencil
+
+    @property
+    def path(self) -> np.ndarray:
+        return self._path
 
     @property
     def ndim(self):
         return self._offsets[0].ndim
 
+    @property
+    def canonical_form(self) -> Tuple[int, ...]:
+        return self._canonical
+
+    @property
+    def unoriented_form(self) -> Tuple[int, ...]:
+        # shared by the loop and its anti_cycle
+        if self._unoriented is None:
+            self._unoriented = orbit_key(self._stencil, np.eye(self.ndim, dtype=np.int64)[None])
+        return self._unoriented
+
+    def transform(self, operation: np.ndarray) -> "FundamentalLoopDefect":
+        stencil = self._stencil.astype(np.int64) @ np.asarray(operation, dtype=np.int64).T
+        return FundamentalLoopDefect([from_doubled(d) for d in stencil.tolist()])
+
+    def orbit(self, point_group: np.ndarray) -> List["FundamentalLoopDefect"]:
+        # one image per unoriented loop, as counted by orbit_size
+        images = dict()
+        for operation in point_group:
+            image = self.transform(operation)
+            images.setdefault(image.unoriented_form, image)
+        return list(images.values())
+
+    def orbit_key(self, point_group: np.ndarray) -> Tuple[int, ...]:
+        return orbit_key(self._stencil, point_group)
+
     def __len__(self):
         return len(self._offsets)
 
@@ -77,17 +155,19 @@ class FundamentalLoopDefect:
         return self.to_string()
 
     def __hash__(self):
-        return hash(self.to_string())
+        return self._hash
 
     def __eq__(self, other: "FundamentalLoopDefect"):
-        return isinstance(other, FundamentalLoopDefect) and (str(self) == str(other))
+        return (isinstance(other, FundamentalLoopDefect) and
+                (self._hash == other._hash) and
+                (self._canonical == other._canonical))
 
 
 def periodic_coordinate(coordinate: LatticeCoordinate,
                         lattice_boundary: LatticeSize = None
                         ) -> LatticeCoordinate:
     if (lattice_boundary is not None) and (len(coordinate) == len(lattice_boundary)):
-        return to_lattice_coordinate([c % lattice_boundary[i] for i, c in enumerate(coordinate.to_list())])
+        return from_doubled([c % (2 * lattice_boundary[i]) for i, c in enumerate(coordinate.doubled)])
     return coordinate
 
 
@@ -98,16 +178,29 @@ def generate_defect_coordinates(defect: FundamentalLoopDefect,
     start_coord = to_lattice_coordinate(start_coord)
     if defect.ndim != start_coord.ndim:
         raise ValueError(f"Error: defect incompatible with coordinate type!")
-    return [periodic_coordinate(c + start_coord, lattice_size) for c in defect]
+    coordinates = defect.path + start_coord.to_doubled()
+    if (lattice_size is not None) and (len(lattice_size) == defect.ndim):
+        coordinates = coordinates % (2 * np.array(lattice_size))
+    return [from_doubled(c) for c in coordinates.tolist()]
+
+
+def group_stencil(loop_group: List[FundamentalLoopDefect]) -> np.ndarray:
+    if len(loop_group) == 0:
+        raise ValueError(f"Error: empty loop group!")
+    if not validate_same_dimension_offsets([loop[0] for loop in loop_group]):
+        raise ValueError(f"Error: loops of mixed dimension in group!")
+    return np.unique(np.concatenate([loop.path for loop in loop_group]), axis=0)
+
+
+def overlap_stencil(loop_group: List[FundamentalLoopDefect]) -> np.ndarray:
+    stencil = group_stencil(loop_group)
+    # anchors s, s' touch a common site when s' - s = p_i - p_j for some path vertices p_i, p_j of the group
+    differences = np.unique((stencil[:, None, :] - stencil[None, :, :]).reshape(-1, stencil.shape[1]), axis=0)
+    return differences[np.any(differences != 0, axis=1)]
 
 
 def anti_cycle(defect: FundamentalLoopDefect):
-    n = len(defect)
-    offsets = []
-    for i in range(n):
-        offset = to_lattice_coordinate([-entry if entry != 0 else entry
-                                        for entry in defect[i].to_list()])
-        offsets.append(offset)
+    offsets = [from_doubled([-entry for entry in offset.doubled]) for offset in defect]
     return FundamentalLoopDefect(offsets[::-1])
 
 
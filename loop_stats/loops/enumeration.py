@@ -0,0 +1,210 @@
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from loop_stats.bravais_lattice import BravaisLattice, from_doubled
+from loop_stats.bravais_lattice.lattice_coordinates import COORDINATE_DTYPE
+from loop_stats.loops.defects import FundamentalLoopDefect, orbit_key, orbit_size
+
+
+Walk = Tuple[int, ...]
+
+
+def nearest_neighbor_steps(lattice: BravaisLattice) -> np.ndarray:
+    _, shells = lattice.neighbor_shells(1)
+    return np.array(shells[0], dtype=COORDINATE_DTYPE)
+
+
+def _step_representatives(steps: np.ndarray, point_group: np.ndarray) -> List[int]:
+    lookup = {tuple(s): i for i, s in enumerate(steps.tolist())}
+    representatives, seen = [], set()
+    for i, step in enumerate(steps.astype(np.int64)):
+        if i in seen:
+            continue
+        representatives.append(i)
+        seen.update(lookup[tuple(image)] for image in (point_group.astype(np.int64) @ step).tolist())
+    return representatives
+
+
+class _SearchSpace:
+    def __init__(self, steps: np.ndarray, max_length: int):
+        self.ndim = steps.shape[1]
+        # a closed walk never goes further than max_length / 2 steps from the origin, one step of
+        # margin keeps every neighbor of a reachable point inside the box
+        self.radius = (max_length // 2 + 2) * int(np.abs(steps).max())
+        self.width = 2 * self.radius + 1
+        self.strides = self.width ** np.arange(self.ndim)[::-1]
+        self.origin = int(self.radius * self.strides.sum())
+        self.deltas = [int(d) for d in steps.astype(np.int64) @ self.strides]
+        self.distance = self.__distances(max_length)
+
+    def __distances(self, max_length: int) -> np.ndarray:
+        # breadth first step counts from the origin, the pruning bound of the search
+        far = np.iinfo(np.int32).max
+        distance = np.full(self.width ** self.ndim, far, dtype=np.int32)
+        distance[self.origin] = 0
+        queue = deque([self.origin])
+        limit = max_length // 2 + 1
+        while queue:
+            index = queue.popleft()
+            d = distance[index] + 1
+            if d > limit:
+                continue
+            for delta in self.deltas:
+                j = index + delta
+                if distance[j] == far:
+                    distance[j] = d
+                    queue.append(j)
+        return distance
+
+
+def _search(task: Tuple[np.ndarray, np.ndarray, int, int, Walk]) -> Dict[Tuple[int, ...], Walk]:
+    steps, point_group, min_length, max_length, prefix = task
+    space = _SearchSpace(steps, max_length)
+    deltas, distance, origin = space.deltas, space.distance.tolist(), space.origin
+    n_steps = len(deltas)
+    steps64, group64 = steps.astype(np.int64), point_group.astype(np.int64)
+    visited = bytearray(len(distance))
+    found, seen = dict(), set()
+
+    position = origin
+    for j in prefix:
+        position += deltas[j]
+        if (position == origin) or visited[position]:
+            return found
+        visited[position] = 1
+    walk = list(prefix)
+
+    def extend(position: int, depth: int):
+        remaining = max_length - depth
+        for j in range(n_steps):
+            target = position + deltas[j]
+            if target == origin:
+                if depth + 1 >= min_length:
+                    closed = tuple(walk + [j])
+                    # the same loop is met once per starting step, only the first meeting is keyed
+                    cyclic = min(closed[k:] + closed[:k] for k in range(len(closed)))
+                    if cyclic not in seen:
+                        seen.add(cyclic)
+                        found.setdefault(orbit_key(steps64[list(closed)], group64), closed)
+                continue
+            if visited[target] or (distance[target] > remaining - 1):
+                continue
+            visited[target] = 1
+            walk.append(j)
+            extend(target, depth + 1)
+            walk.pop()
+            visited[target] = 0
+
+    if distance[position] <= max_length - len(prefix):
+        extend(position, len(prefix))
+    return found
+
+
+class LoopLibrary:
+    def __init__(self,
+                 offsets: np.ndarray,
+                 lengths: np.ndarray,
+                 counts: np.ndarray,
+                 point_group: np.ndarray,
+                 ):
+        self._offsets = np.asarray(offsets, dtype=COORDINATE_DTYPE)
+        self._lengths = np.asarray(lengths, dtype=np.int64)
+        self._counts = np.asarray(counts, dtype=np.int64)
+        self._point_group = np.asarray(point_group, dtype=np.int32)
+        if not (len(self._offsets) == len(self._lengths) == len(self._counts)):
+            raise ValueError(f"Error: offsets, lengths and counts of the library do not match!")
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self._lengths
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    @property
+    def point_group(self) -> np.ndarray:
+        return self._point_group
+
+    @property
+    def ndim(self) -> int:
+        return self._point_group.shape[-1]
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __getitem__(self, item: int) -> FundamentalLoopDefect:
+        return FundamentalLoopDefect([from_doubled(d) for d in self._offsets[item, :self._lengths[item]].tolist()])
+
+    def count_by_length(self) -> Dict[int, int]:
+        totals = np.bincount(self._lengths, weights=self._counts)
+        return {n: int(totals[n]) for n in np.unique(self._lengths).tolist()}
+
+    def loops(self,
+              min_length: int = 0,
+              max_length: int = None,
+              expand: bool = False,
+              ) -> List[FundamentalLoopDefect]:
+        keep = self._lengths >= min_length
+        if max_length is not None:
+            keep &= self._lengths <= max_length
+        representatives = [self[i] for i in np.flatnonzero(keep)]
+        if not expand:
+            return representatives
+        # library loops carry no orientation, anti_cycle gives the reversed traversal of any of them
+        return [image for loop in representatives for image in loop.orbit(self._point_group)]
+
+    def save(self, path: str):
+        np.savez_compressed(path,
+                            offsets=self._offsets,
+                            lengths=self._lengths,
+                            counts=self._counts,
+                            point_group=self._point_group)
+
+    @classmethod
+    def load(cls, path: str) -> "LoopLibrary":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['offsets'], data['lengths'], data['counts'], data['point_group'])
+
+
+def enumerate_loops(lattice: BravaisLattice,
+                    max_length: int,
+                    min_length: int = 3,
+                    n_workers: int = None,
+                    ) -> LoopLibrary:
+    if min_length < 2:
+        raise ValueError(f"Error: loops need at least two steps, received min_length {min_length}!")
+    steps = nearest_neighbor_steps(lattice)
+    point_group = lattice.point_group
+    ndim = lattice.ndim
+
+    # up to a cyclic shift and a point group operation every loop starts with a representative step,
+    # the search is split into independent tasks by its first two steps
+    tasks = [(steps, point_group, min_length, max_length, (i, j))
+             for i in _step_representatives(steps, point_group)
+             for j in range(len(steps))]
+    if (n_workers is None) or (n_workers <= 1):
+        results = [_search(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_search, tasks))
+    classes = dict()
+    for found in results:
+        for key, walk in found.items():
+            classes.setdefault(key, walk)
+
+    # the library keeps the smallest member of every class, which does not depend on the task split
+    keys = sorted(classes.keys(), key=lambda k: (len(k), k))
+    lengths = np.array([(len(k) - 1) // ndim for k in keys], dtype=np.int64)
+    offsets = np.zeros((len(keys), lengths.max(initial=0), ndim), dtype=COORDINATE_DTYPE)
+    counts = np.zeros(len(keys), dtype=np.int64)
+    for i, key in enumerate(keys):
+        stencil = np.array(key[1:], dtype=np.int64).reshape(-1, ndim)
+        offsets[i, :len(stencil)] = stencil
+        counts[i] = orbit_size(stencil, point_group)
+    return LoopLibrary(offsets, lengths, counts, point_group)
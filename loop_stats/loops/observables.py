@@ -0,0 +1,455 @@
+import numpy as np
+from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Sequence, Tuple, Union
+
+
+AccumulatorState = Dict[str, np.ndarray]
+
+
+class Accumulator:
+    __metaclass__ = ABCMeta
+    kind: str = None
+
+    @abstractmethod
+    def add_many(self, samples: np.ndarray):
+        raise NotImplemented
+
+    @abstractmethod
+    def merge(self, other: "Accumulator") -> "Accumulator":
+        raise NotImplemented
+
+    @abstractmethod
+    def to_state(self) -> AccumulatorState:
+        raise NotImplemented
+
+    @classmethod
+    def from_state(cls, state: AccumulatorState) -> "Accumulator":
+        raise NotImplemented
+
+    def add(self, sample: Union[float, np.ndarray]):
+        self.add_many(np.asarray(sample)[None])
+
+    def copy(self) -> "Accumulator":
+        return self.from_state(self.to_state())
+
+    def _check_merge(self, other: "Accumulator"):
+        if not isinstance(other, self.__class__):
+            raise ValueError(f"Error: can not merge {other.__class__.__name__} into {self.__class__.__name__}!")
+
+
+def _as_samples(samples: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    samples = np.asarray(samples, dtype=float)
+    if samples.shape[1:] != shape:
+        samples = samples.reshape((-1,) + shape)
+    return samples
+
+
+class Welford(Accumulator):
+    kind = 'welford'
+
+    def __init__(self, shape: Tuple[int, ...] = ()):
+        self._shape = tuple(shape)
+        self._count = 0
+        self._mean = np.zeros(self._shape)
+        self._m2 = np.zeros(self._shape)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean.copy()
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self._count < 2:
+            return np.full(self._shape, np.nan)
+        return self._m2 / (self._count - 1)
+
+    @property
+    def std_error(self) -> np.ndarray:
+        return np.sqrt(self.variance / max(self._count, 1))
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray):
+        # pairwise update of Chan et al., exact for any split of the stream
+        total = self._count + count
+        if count == 0:
+            return
+        delta = mean - self._mean
+        self._mean = self._mean + delta * (count / total)
+        self._m2 = self._m2 + m2 + delta * delta * (self._count * count / total)
+        self._count = total
+
+    def add_many(self, samples: np.ndarray):
+        samples = _as_samples(samples, self._shape)
+        if len(samples) > 0:
+            mean = samples.mean(axis=0)
+            self._combine(len(samples), mean, np.sum((samples - mean) ** 2, axis=0))
+
+    def merge(self, other: "Welford") -> "Welford":
+        self._check_merge(other)
+        self._combine(other._count, other._mean, other._m2)
+        return self
+
+    def to_state(self) -> AccumulatorState:
+        return dict(kind=np.array(self.kind),
+                    shape=np.array(self._shape, dtype=np.int64),
+                    count=np.array(self._count, dtype=np.int64),
+                    mean=self._mean.copy(),
+                    m2=self._m2.copy())
+
+    @classmethod
+    def from_state(cls, state: AccumulatorState) -> "Welford":
+        accumulator = cls(tuple(int(s) for s in state['shape']))
+        accumulator._count = int(state['count'])
+        accumulator._mean = np.array(state['mean'], dtype=float)
+        accumulator._m2 = np.array(state['m2'], dtype=float)
+        return accumulator
+
+
+class BinningAnalysis(Accumulator):
+    kind = 'binning'
+
+    def __init__(self,
+                 shape: Tuple[int, ...] = (),
+                 max_levels: int = 40,
+                 ):
+        self._shape = tuple(shape)
+        self._max_levels = max_levels
+        # level k keeps the statistics of the means of consecutive bins of 2^k samples, plus the
+        # one bin that still waits for its partner
+        self._levels: List[Welford] = []
+        self._pending: List[Union[np.ndarray, None]] = []
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def n_levels(self) -> int:
+        return len(self._levels)
+
+    @property
+    def count(self) -> int:
+        return self._levels[0].count if self._levels else 0
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._levels[0].mean if self._levels else np.full(self._shape, np.nan)
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self._levels[0].variance if self._levels else np.full(self._shape, np.nan)
+
+    def _push(self, level: int, values: np.ndarray):
+        while (len(values) > 0) and (level < self._max_levels):
+            if level == len(self._levels):
+                self._levels.append(Welford(self._shape))
+                self._pending.append(None)
+            self._levels[level].add_many(values)
+            if self._pending[level] is not None:
+                values = np.concatenate([self._pending[level][None], values])
+                self._pending[level] = None
+            n_pairs = len(values) // 2
+            if len(values) % 2 == 1:
+                self._pending[level] = values[-1]
+            values = 0.5 * (values[0:2 * n_pairs:2] + values[1:2 * n_pairs:2])
+            level += 1
+
+    def add_many(self, samples: np.ndarray):
+        self._push(0, _as_samples(samples, self._shape))
+
+    def merge(self, other: "BinningAnalysis") -> "BinningAnalysis":
+        self._check_merge(other)
+        if other._shape != self._shape:
+            raise ValueError(f"Error: shape mismatch in merge [{other._shape} != {self._shape}]!")
+        for level, accumulator in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(Welford(self._shape))
+                self._pending.append(None)
+            self._levels[level].merge(accumulator)
+        # the half filled bins of both streams pair up into a full bin one level higher
+        for level, pending in enumerate(other._pending):
+            if pending is None:
+                continue
+            if self._pending[level] is None:
+                self._pending[level] = pending.copy()
+            else:
+                value = 0.5 * (self._pending[level] + pending)
+                self._pending[level] = None
+                self._push(level + 1, value[None])
+        return self
+
+    def std_errors(self) -> np.ndarray:
+        return np.array([level.std_error for level in self._levels])
+
+    def bin_counts(self) -> np.ndarray:
+        return np.array([level.count for level in self._levels], dtype=np.int64)
+
+    def converged_level(self, min_bins: int = 32) -> int:
+        counts = self.bin_counts()
+        levels = np.flatnonzero(counts >= min_bins)
+        return int(levels[-1]) if len(levels) > 0 else 0
+
+    def std_error(self, min_bins: int = 32) -> np.ndarray:
+        if not self._levels:
+            return np.full(self._shape, np.nan)
+        return self._levels[self.converged_level(min_bins)].std_error
+
+    def autocorrelation_time(self, min_bins: int = 32) -> np.ndarray:
+        if not self._levels:
+            return np.full(self._shape, np.nan)
+        naive = self._levels[0].std_error
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 0.5 * (self.std_error(min_bins) / naive) ** 2
+
+    def to_state(self) -> AccumulatorState:
+        n = len(self._levels)
+        return dict(kind=np.array(self.kind),
+                    shape=np.array(self._shape, dtype=np.int64),
+                    max_levels=np.array(self._max_levels, dtype=np.int64),
+                    count=np.array([level.count for level in self._levels], dtype=np.int64),
+                    mean=np.array([level._mean for level in self._levels]).reshape((n,) + self._shape),
+                    m2=np.array([level._m2 for level in self._levels]).reshape((n,) + self._shape),
+                    pending=np.array([np.zeros(self._shape) if p is None else p
+                                      for p in self._pending]).reshape((n,) + self._shape),
+                    has_pending=np.array([p is not None for p in self._pending], dtype=bool))
+
+    @classmethod
+    def from_state(cls, state: AccumulatorState) -> "BinningAnalysis":
+        accumulator = cls(tuple(int(s) for s in state['shape']), max_levels=int(state['max_levels']))
+        for count, mean, m2, pending, has_pending in zip(state['count'], state['mean'], state['m2'],
+                                                         state['pending'], state['has_pending']):
+            accumulator._levels.append(Welford.from_state(dict(shape=state['shape'], count=count, mean=mean, m2=m2)))
+            accumulator._pending.append(np.array(pending, dtype=float) if has_pending else None)
+        return accumulator
+
+
+class AutocorrelationEstimator(Accumulator):
+    kind = 'autocorrelation'
+
+    def __init__(self,
+                 max_lag: int = 100,
+                 shape: Tuple[int, ...] = (),
+                 ):
+        self._max_lag = max_lag
+        self._shape = tuple(shape)
+        lags = (max_lag + 1,) + self._shape
+        self._count = 0
+        # lagged sums over the pairs (x_t, x_{t+l}), only the last max_lag samples are kept
+        self._pairs = np.zeros(max_lag + 1, dtype=np.int64)
+        self._products = np.zeros(lags)
+        self._heads = np.zeros(lags)
+        self._tails = np.zeros(lags)
+        self._history = np.zeros((0,) + self._shape)
+
+    @property
+    def max_lag(self) -> int:
+        return self._max_lag
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def add_many(self, samples: np.ndarray):
+        samples = _as_samples(samples, self._shape)
+        if len(samples) == 0:
+            return
+        values = np.concatenate([self._history, samples])
+        start = len(self._history)
+        for lag in range(self._max_lag + 1):
+            first = max(start, lag)
+            if first >= len(values):
+                break
+            heads, tails = values[first - lag:len(values) - lag], values[first:]
+            self._pairs[lag] += len(tails)
+            self._products[lag] += np.sum(heads * tails, axis=0)
+            self._heads[lag] += np.sum(heads, axis=0)
+            self._tails[lag] += np.sum(tails, axis=0)
+        self._history = values[-self._max_lag:] if self._max_lag > 0 else values[:0]
+        self._count += len(samples)
+
+    def merge(self, other: "AutocorrelationEstimator") -> "AutocorrelationEstimator":
+        self._check_merge(other)
+        if (other._max_lag != self._max_lag) or (other._shape != self._shape):
+            raise ValueError(f"Error: incompatible autocorrelation estimators in merge!")
+        # pairs straddling the two streams are never formed, the streams are independent chains
+        self._count += other._count
+        self._pairs += other._pairs
+        self._products += other._products
+        self._heads += other._heads
+        self._tails += other._tails
+        return self
+
+    def autocovariance(self) -> np.ndarray:
+        pairs = np.maximum(self._pairs, 1).reshape((-1,) + (1,) * len(self._shape))
+        covariance = self._products / pairs - (self._heads / pairs) * (self._tails / pairs)
+        covariance[self._pairs == 0] = np.nan
+        return covariance
+
+    def autocorrelation(self) -> np.ndarray:
+        covariance = self.autocovariance()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return covariance / covariance[0]
+
+    def integrated_time(self, window: float = 5.0) -> np.ndarray:
+        if self._max_lag == 0:
+            return np.full(self._shape, 0.5)
+        rho = np.nan_to_num(self.autocorrelation()[1:])
+        taus = 0.5 + np.cumsum(rho, axis=0)
+        # automatic windowing: cut the sum at the first lag M with M >= window * tau(M)
+        lags = np.arange(1, self._max_lag + 1).reshape((-1,) + (1,) * len(self._shape))
+        cut = lags >= window * taus
+        first = np.where(np.any(cut, axis=0), np.argmax(cut, axis=0), self._max_lag - 1)
+        return np.take_along_axis(taus, np.asarray(first)[None], axis=0)[0]
+
+    def to_state(self) -> AccumulatorState:
+        return dict(kind=np.array(self.kind),
+                    shape=np.array(self._shape, dtype=np.int64),
+                    max_lag=np.array(self._max_lag, dtype=np.int64),
+                    count=np.array(self._count, dtype=np.int64),
+                    pairs=self._pairs.copy(),
+                    products=self._products.copy(),
+                    heads=self._heads.copy(),
+                    tails=self._tails.copy(),
+                    history=self._history.copy())
+
+    @classmethod
+    def from_state(cls, state: AccumulatorState) -> "AutocorrelationEstimator":
+        accumulator = cls(int(state['max_lag']), tuple(int(s) for s in state['shape']))
+        accumulator._count = int(state['count'])
+        accumulator._pairs = np.array(state['pairs'], dtype=np.int64)
+        accumulator._products = np.array(state['products'], dtype=float)
+        accumulator._heads = np.array(state['heads'], dtype=float)
+        accumulator._tails = np.array(state['tails'], dtype=float)
+        accumulator._history = np.array(state['history'], dtype=float)
+        return accumulator
+
+
+class Histogram(Accumulator):
+    kind = 'histogram'
+
+    def __init__(self,
+                 low: float,
+                 high: float,
+                 n_bins: int,
+                 ):
+        if (high <= low) or (n_bins < 1):
+            raise ValueError(f"Error: invalid histogram range [{low}, {high}) with {n_bins} bins!")
+        self._low = float(low)
+        self._high = float(high)
+        self._counts = np.zeros(n_bins, dtype=np.int64)
+        self._underflow = 0
+        self._overflow = 0
+
+    @classmethod
+    def integer(cls, max_value: int, min_value: int = 0) -> "Histogram":
+        return cls(min_value - 0.5, max_value + 0.5, max_value - min_value + 1)
+
+    @property
+    def n_bins(self) -> int:
+        return len(self._counts)
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self._low, self._high, self.n_bins + 1)
+
+    @property
+    def centers(self) -> np.ndarray:
+        edges = self.edges
+        return 0.5 * (edges[1:] + edges[:-1])
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts.copy()
+
+    @property
+    def underflow(self) -> int:
+        return self._underflow
+
+    @property
+    def overflow(self) -> int:
+        return self._overflow
+
+    @property
+    def count(self) -> int:
+        return int(self._counts.sum()) + self._underflow + self._overflow
+
+    def density(self) -> np.ndarray:
+        total = self._counts.sum()
+        return self._counts / total if total > 0 else np.zeros(self.n_bins)
+
+    def add_many(self,
+                 samples: np.ndarray,
+                 weights: np.ndarray = None):
+        samples = np.asarray(samples, dtype=float).ravel()
+        weights = np.ones(len(samples), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        bins = np.floor((samples - self._low) * (self.n_bins / (self._high - self._low))).astype(np.int64)
+        self._underflow += int(weights[bins < 0].sum())
+        self._overflow += int(weights[bins >= self.n_bins].sum())
+        inside = (bins >= 0) & (bins < self.n_bins)
+        self._counts += np.bincount(bins[inside], weights=weights[inside], minlength=self.n_bins).astype(np.int64)
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        self._check_merge(other)
+        if (other._low, other._high, other.n_bins) != (self._low, self._high, self.n_bins):
+            raise ValueError(f"Error: histogram binning mismatch in merge!")
+        self._counts += other._counts
+        self._underflow += other._underflow
+        self._overflow += other._overflow
+        return self
+
+    def to_state(self) -> AccumulatorState:
+        return dict(kind=np.array(self.kind),
+                    range=np.array([self._low, self._high]),
+                    counts=self._counts.copy(),
+                    outside=np.array([self._underflow, self._overflow], dtype=np.int64))
+
+    @classmethod
+    def from_state(cls, state: AccumulatorState) -> "Histogram":
+        low, high = (float(v) for v in state['range'])
+        accumulator = cls(low, high, len(state['counts']))
+        accumulator._counts = np.array(state['counts'], dtype=np.int64)
+        accumulator._underflow, accumulator._overflow = (int(v) for v in state['outside'])
+        return accumulator
+
+
+ACCUMULATORS = {cls.kind: cls for cls in (Welford, BinningAnalysis, AutocorrelationEstimator, Histogram)}
+
+
+def accumulator_from_state(state: AccumulatorState) -> Accumulator:
+    kind = str(state['kind'])
+    if kind not in ACCUMULATORS:
+        raise ValueError(f"Error: unknown accumulator kind [{kind}]!")
+    return ACCUMULATORS[kind].from_state(state)
+
+
+def merge_all(accumulators: Sequence[Accumulator]) -> Accumulator:
+    if len(accumulators) == 0:
+        raise ValueError(f"Error: nothing to merge!")
+    merged = accumulators[0].copy()
+    for accumulator in accumulators[1:]:
+        merged.merge(accumulator)
+    return merged
+
+
+def pack_states(accumulators: Dict[str, Accumulator]) -> Dict[str, np.ndarray]:
+    arrays = dict()
+    for name, accumulator in accumulators.items():
+        if '.' in name:
+            raise ValueError(f"Error: accumulator names can not contain '.' [{name}]!")
+        arrays.update({f'{name}.{k}': v for k, v in accumulator.to_state().items()})
+    return arrays
+
+
+def unpack_states(arrays: Dict[str, np.ndarray]) -> Dict[str, Accumulator]:
+    states = dict()
+    for key, value in arrays.items():
+        name, _, field = key.partition('.')
+        states.setdefault(name, dict())[field] = value
+    return {name: accumulator_from_state(state) for name, state in states.items()}
@@ -0,0 +1,76 @@
+import numpy as np
+from typing import Dict, Iterator, List, Tuple, Union
+from loop_stats.loops.defects import FundamentalLoopDefect, anti_cycle
+
+
+class LoopRegistry:
+    def __init__(self, point_group: np.ndarray = None):
+        self._loops: List[FundamentalLoopDefect] = []
+        self._index: Dict[Tuple[int, ...], int] = dict()
+        self._orbits: Dict[Tuple[int, ...], Tuple[FundamentalLoopDefect, ...]] = dict()
+        self._point_group = point_group
+
+    @property
+    def point_group(self) -> np.ndarray:
+        return self._point_group
+
+    @point_group.setter
+    def point_group(self, operations: np.ndarray):
+        self._point_group = operations
+        self._orbits.clear()
+
+    def __len__(self) -> int:
+        return len(self._loops)
+
+    def __getitem__(self, item: int) -> FundamentalLoopDefect:
+        return self._loops[item]
+
+    def __iter__(self) -> Iterator[FundamentalLoopDefect]:
+        return self._loops.__iter__()
+
+    def __contains__(self, loop: FundamentalLoopDefect) -> bool:
+        return loop.canonical_form in self._index
+
+    def index(self, loop: FundamentalLoopDefect) -> int:
+        if loop.canonical_form not in self._index:
+            raise ValueError(f"Error: loop {loop} is not registered!")
+        return self._index[loop.canonical_form]
+
+    def add(self, loop: FundamentalLoopDefect) -> int:
+        key = loop.canonical_form
+        if key not in self._index:
+            self._index[key] = len(self._loops)
+            self._loops.append(loop)
+        return self._index[key]
+
+    def orbit(self, loop: FundamentalLoopDefect) -> Tuple[FundamentalLoopDefect, ...]:
+        if self._point_group is None:
+            raise ValueError(f"Error: registry without a point group has no orbits!")
+        # orbits are unoriented, a loop and its anti_cycle have the same one
+        key = loop.unoriented_form
+        if key not in self._orbits:
+            orbit = tuple(loop.orbit(self._point_group))
+            # every member of an orbit has the same orbit, one enumeration serves them all
+            for image in orbit:
+                self._orbits[image.unoriented_form] = orbit
+        return self._orbits[key]
+
+    def add_orbit(self, loop: FundamentalLoopDefect) -> List[int]:
+        # loops are placed oriented, both traversals of every image are registered
+        return [self.add(oriented) for image in self.orbit(loop) for oriented in (image, anti_cycle(image))]
+
+    def orbit_representative(self, loop: FundamentalLoopDefect) -> FundamentalLoopDefect:
+        return min(self.orbit(loop), key=lambda image: image.canonical_form)
+
+    def orbit_labels(self) -> np.ndarray:
+        # loops of one orbit share a label, labels are numbered in order of first registration
+        labels, keys = np.zeros(len(self._loops), dtype=np.int64), dict()
+        for i, loop in enumerate(self._loops):
+            key = self.orbit_representative(loop).canonical_form
+            labels[i] = keys.setdefault(key, len(keys))
+        return labels
+
+    def extend(self, loops: Union[FundamentalLoopDefect, List[FundamentalLoopDefect]]) -> List[int]:
+        if not isinstance(loops, (list, tuple)):
+            loops = [loops]
+        return [self.add(loop) for loop in loops]
@@ -1,2 +1,18 @@
-from .utility import independent_node_partition
+from loop_stats._lazy import lazy_module
+from .utility import independent_node_partition, loop_neighbor_table
+from .coloring import conflict_graph, jones_plassmann_coloring, rebalance_colors
 from .info import Defect2DInfo, Defect3DInfo, DefectInfoFactory
+from .system import BravaisLatticeWithLoopDefects
+from .simulator import LoopDefectSimulator, counter_uniform
+
+# process pools, shared memory and checkpoint io are only needed by driver scripts
+__getattr__, _lazy_names = lazy_module(__name__, dict(ScalingStudyRunner='.runner',
+                                                      SharedArrays='.runner',
+                                                      parameter_grid='.runner',
+                                                      SlabDecomposition='.decomposition',
+                                                      save_checkpoint='.checkpoint',
+                                                      load_checkpoint='.checkpoint'))
+
+__all__ = ['independent_node_partition', 'loop_neighbor_table', 'conflict_graph', 'jones_plassmann_coloring',
+           'rebalance_colors', 'Defect2DInfo', 'Defect3DInfo', 'DefectInfoFactory',
+           'BravaisLatticeWithLoopDefects', 'LoopDefectSimulator', 'counter_uniform'] + _lazy_names
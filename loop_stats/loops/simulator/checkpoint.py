@@ -0,0 +1,130 @@
+import os
+import uuid
+import numpy as np
+from typing import Dict, List, Tuple, Union
+from loop_stats.bravais_lattice import LatticeCache, from_doubled
+from loop_stats.loops.defects import FundamentalLoopDefect
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+from loop_stats.loops.simulator.simulator import LoopDefectSimulator
+
+
+CHECKPOINT_VERSION = 1
+LATTICE_FLAGS = ('body_centered', 'xy_face_centered', 'yz_face_centered', 'xz_face_centered')
+SIMULATOR_PREFIX = 'simulator.'
+OBSERVABLE_PREFIX = 'observable.'
+
+
+def _pack_loops(loops: List[FundamentalLoopDefect], ndim: int) -> Tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(loop) for loop in loops], dtype=np.int64)
+    stencils = np.zeros((len(loops), lengths.max(initial=0), ndim), dtype=np.int32)
+    for i, loop in enumerate(loops):
+        stencils[i, :len(loop)] = loop.stencil
+    return stencils, lengths
+
+
+def _unpack_loops(stencils: np.ndarray, lengths: np.ndarray) -> List[FundamentalLoopDefect]:
+    return [FundamentalLoopDefect([from_doubled(d) for d in stencil[:n]])
+            for stencil, n in zip(stencils, lengths)]
+
+
+def _write_atomic(path: str, arrays: Dict[str, np.ndarray]):
+    # a preempted job leaves either the previous checkpoint or the new one, never a truncated file
+    path = os.path.abspath(path)
+    staging = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.{os.getpid()}.{uuid.uuid4().hex}')
+    try:
+        with open(staging, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, path)
+    except BaseException:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+    _fsync_directory(os.path.dirname(path))
+
+
+def _fsync_directory(path: str):
+    # the rename itself lives in the directory entry, it survives a crash only once the directory is synced
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_checkpoint(path: str,
+                    state: Union[LoopDefectSimulator, BravaisLatticeWithLoopDefects],
+                    observables: Dict[str, np.ndarray] = None,
+                    partitions: bool = True):
+    if isinstance(state, LoopDefectSimulator):
+        simulator, system = state, state.system
+    elif isinstance(state, BravaisLatticeWithLoopDefects):
+        simulator, system = None, state
+    else:
+        raise ValueError(f"Error: can not checkpoint object of type {type(state).__name__}!")
+
+    stencils, lengths = _pack_loops(system.loop_group, system.ndim)
+    params = system.lattice_params
+    # only the construction parameters of the lattice are kept, its arrays are rebuilt or read from a cache
+    arrays = dict(version=np.array(CHECKPOINT_VERSION),
+                  basis=np.array([b.to_array() for b in system.basis]),
+                  shape=np.array(system.shape, dtype=np.int64),
+                  lattice_flags=np.array([bool(params.get(k, False)) for k in LATTICE_FLAGS]),
+                  defect_field=system.defect_field,
+                  loop_occupancy=system.loop_occupancy,
+                  loop_stencils=stencils,
+                  loop_lengths=lengths)
+    if simulator is not None:
+        for k, v in simulator.to_dict().items():
+            arrays[SIMULATOR_PREFIX + k] = np.array(v)
+        # the partitions fix the update order, a resumed run rebuilds the same ones only when the
+        # coloring is deterministic, keeping them makes the resume bit identical regardless
+        if partitions:
+            arrays.update(partition_nodes=np.concatenate(simulator.partitions),
+                          partition_offsets=np.cumsum([0] + [len(p) for p in simulator.partitions]))
+    for name, value in (observables or dict()).items():
+        arrays[OBSERVABLE_PREFIX + name] = np.asarray(value)
+    _write_atomic(path, arrays)
+
+
+def load_checkpoint(path: str,
+                    cache: LatticeCache = None,
+                    show_progress: bool = False,
+                    ) -> Tuple[Union[LoopDefectSimulator, BravaisLatticeWithLoopDefects], Dict[str, np.ndarray]]:
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+    if int(arrays['version']) > CHECKPOINT_VERSION:
+        raise ValueError(f"Error: unsupported checkpoint version {int(arrays['version'])}!")
+
+    system = BravaisLatticeWithLoopDefects(list(arrays['basis']),
+                                           size=tuple(int(s) for s in arrays['shape']),
+                                           cache=cache,
+                                           show_progress=show_progress,
+                                           **dict(zip(LATTICE_FLAGS, arrays['lattice_flags'].tolist())))
+    system.register_loop(_unpack_loops(arrays['loop_stencils'], arrays['loop_lengths']))
+    if system.defect_field.shape != arrays['defect_field'].shape:
+        raise ValueError(f"Error: checkpoint does not match the lattice {system.defect_field.shape}!")
+    system.defect_field[...] = arrays['defect_field']
+    system.loop_occupancy[...] = arrays['loop_occupancy']
+    observables = {k[len(OBSERVABLE_PREFIX):]: v for k, v in arrays.items() if k.startswith(OBSERVABLE_PREFIX)}
+
+    state = {k[len(SIMULATOR_PREFIX):]: v.item() for k, v in arrays.items() if k.startswith(SIMULATOR_PREFIX)}
+    if len(state) == 0:
+        return system, observables
+    partitions = None
+    if 'partition_nodes' in arrays:
+        offsets = arrays['partition_offsets']
+        partitions = [arrays['partition_nodes'][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    simulator = LoopDefectSimulator(system,
+                                    beta=state['beta'],
+                                    coupling=state['coupling'],
+                                    chemical_potential=state['chemical_potential'],
+                                    seed=state['seed'],
+                                    partitions=partitions,
+                                    balance=state['balance'],
+                                    cache=cache)
+    simulator.load_dict(**state)
+    return simulator, observables
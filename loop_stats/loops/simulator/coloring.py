@@ -0,0 +1,101 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import List
+
+
+def conflict_graph(table: sp.spmatrix) -> sp.csr_matrix:
+    adjacency = (table + table.T).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    adjacency.data = np.ones_like(adjacency.data, dtype=np.int8)
+    return adjacency
+
+
+def _edge_list(adjacency: sp.csr_matrix):
+    adjacency = sp.csr_matrix(adjacency)
+    rows = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr))
+    return rows, adjacency.indices.astype(np.intp)
+
+
+def _gather_rows(graph: sp.csr_matrix, rows: np.ndarray):
+    starts = graph.indptr[rows]
+    lengths = graph.indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, graph.indices[np.repeat(starts, lengths) + offsets]
+
+
+def jones_plassmann_coloring(adjacency: sp.spmatrix,
+                             seed: int = 0,
+                             largest_first: bool = True,
+                             ) -> np.ndarray:
+    n = adjacency.shape[0]
+    rows, cols = _edge_list(adjacency)
+    degree = np.bincount(rows, minlength=n)
+    # random unique priorities keep the longest chain of decreasing priority, hence the number of rounds,
+    # logarithmic in n; coloring a vertex as soon as all of its higher priority neighbors are colored
+    # reproduces the sequential greedy coloring in priority order
+    priority = np.random.default_rng(seed).permutation(n).astype(np.int64)
+    if largest_first:
+        priority = priority + degree.astype(np.int64) * n
+
+    higher = priority[cols] > priority[rows]
+    # before[v] lists the higher priority neighbors of v, after[u] the lower priority ones
+    before = sp.csr_matrix((np.ones(higher.sum(), dtype=np.int8), (rows[higher], cols[higher])), shape=(n, n))
+    after = before.T.tocsr()
+    waiting = np.diff(before.indptr)
+
+    colors = np.full(n, -1, dtype=np.intp)
+    n_colors = int(degree.max(initial=0)) + 1
+    ready = np.flatnonzero(waiting == 0)
+    while len(ready) > 0:
+        owner, neighbors = _gather_rows(before, ready)
+        used = np.zeros((len(ready), n_colors + 1), dtype=bool)
+        used[owner, colors[neighbors]] = True
+        colors[ready] = np.argmin(used, axis=1)
+
+        _, released = _gather_rows(after, ready)
+        released, hits = np.unique(released, return_counts=True)
+        waiting[released] -= hits
+        ready = released[waiting[released] == 0]
+    return colors
+
+
+def rebalance_colors(adjacency: sp.spmatrix,
+                     colors: np.ndarray,
+                     max_iter: int = 100,
+                     ) -> np.ndarray:
+    colors = np.array(colors, dtype=np.intp)
+    rows, cols = _edge_list(adjacency)
+    n_colors = int(colors.max(initial=-1)) + 1
+    for _ in range(max_iter):
+        sizes = np.bincount(colors, minlength=n_colors)
+        moved = False
+        for src in np.argsort(-sizes, kind='stable'):
+            for dst in np.argsort(sizes, kind='stable'):
+                excess = (sizes[src] - sizes[dst]) // 2
+                if excess <= 0:
+                    break
+                # a color class is independent, so any subset of it can move to a color none of its
+                # members' neighbors use
+                blocked = np.zeros(len(colors), dtype=bool)
+                blocked[rows[colors[cols] == dst]] = True
+                movable = np.flatnonzero((colors == src) & ~blocked)
+                if len(movable) > 0:
+                    colors[movable[np.linspace(0, len(movable) - 1, min(excess, len(movable))).astype(int)]] = dst
+                    moved = True
+                    break
+            if moved:
+                break
+        if not moved:
+            break
+    return colors
+
+
+def color_classes(colors: np.ndarray, nodes: np.ndarray = None) -> List[np.ndarray]:
+    if nodes is None:
+        nodes = np.arange(len(colors))
+    _, colors = np.unique(colors, return_inverse=True)
+    order = np.argsort(colors, kind='stable')
+    counts = np.bincount(colors)
+    return np.split(nodes[order], np.cumsum(counts)[:-1])
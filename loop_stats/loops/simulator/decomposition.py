@@ -0,0 +1,155 @@
+import numpy as np
+import multiprocessing as mp
+from typing import Any, Dict, List, Tuple
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+from loop_stats.loops.simulator.simulator import (LoopDefectSimulator,
+                                                  compile_loop_moves,
+                                                  draw_moves,
+                                                  place_moves,
+                                                  accept_moves)
+from loop_stats.loops.simulator.runner import ArrayDescriptor, SharedArrays, attach_shared_array
+
+
+Slab = Tuple[int, int, int, int, int]
+
+
+def _sweep_slab(rank: int,
+                lattice_spec: Dict[str, Any],
+                slab: Slab,
+                moves: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                params: Dict[str, float],
+                descriptors: Dict[str, ArrayDescriptor],
+                barrier,
+                first_sweep: int,
+                n_sweeps: int):
+    blocks, arrays = [], dict()
+    try:
+        for name, descriptor in descriptors.items():
+            shm, arrays[name] = attach_shared_array(descriptor, writeable=True)
+            blocks.append(shm)
+        lattice = BravaisLattice(lazy=True, show_progress=False, **lattice_spec)
+        n_sites, ndim = lattice.size, lattice.ndim
+        lo, hi, origin, n_local, n_exchange = slab
+        field, occupancy = arrays['field'], arrays['occupancy']
+        nodes, offsets = arrays['partition_nodes'], arrays['partition_offsets']
+        classes = []
+        for i in range(len(offsets) - 1):
+            p = nodes[offsets[i]:offsets[i + 1]]
+            classes.append(np.array(p[(p >= lo) & (p < hi)], dtype=np.intp))
+
+        # owned cells plus a ghost layer on either side, contiguous modulo the lattice size
+        local_sites = (origin + np.arange(n_local)) % n_sites
+        local_field = field[local_sites]
+        if 2 * n_exchange < n_local:
+            ghost = np.concatenate([np.arange(n_exchange), np.arange(n_local - n_exchange, n_local)])
+        else:
+            ghost = np.arange(n_local)
+        accepted = 0
+        for sweep in range(first_sweep, first_sweep + n_sweeps):
+            for anchors in classes:
+                if len(anchors) > 0:
+                    loop_id, sign, u = draw_moves(params['seed'], sweep, anchors, moves[0].shape[0])
+                    placeable, touched, steps = place_moves(lattice, anchors, loop_id, sign, moves)
+                    local = (touched - origin) % n_sites
+                    accept = accept_moves(local_field[local], steps, sign,
+                                          occupancy[anchors, loop_id] > 0, placeable, u,
+                                          params['beta'], params['coupling'], params['chemical_potential'])
+                    steps = steps[accept].reshape(-1, ndim)
+                    # a color class is conflict free, so no other slab writes the sites touched here
+                    np.add.at(field, touched[accept].ravel(), steps)
+                    np.add.at(local_field, local[accept].ravel(), steps)
+                    np.add.at(occupancy, (anchors[accept], loop_id[accept]), sign[accept])
+                    accepted += int(accept.sum())
+                barrier.wait()
+                # only sites within one halo of a slab boundary can be changed by a neighboring slab
+                local_field[ghost] = field[local_sites[ghost]]
+                barrier.wait()
+        arrays['accepted'][rank] = accepted
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        arrays.clear()
+        for shm in blocks:
+            shm.close()
+
+
+class SlabDecomposition:
+    def __init__(self,
+                 system: BravaisLatticeWithLoopDefects,
+                 n_slabs: int,
+                 ):
+        length = system.shape[0]
+        if (n_slabs < 1) or (n_slabs > length):
+            raise ValueError(f"Error: number of slabs must be between 1 and {length}, received {n_slabs}!")
+        offsets, _, mask = compile_loop_moves(system)
+        reach = int(np.abs(offsets[..., 0][mask]).max(initial=0))
+        self._system = system
+        self._n_slabs = n_slabs
+        # doubled offsets of at most `reach` leave the anchor cell by at most ceil(reach / 2) cells
+        self._halo = (reach + 1) // 2
+        self._stride = system.size // length
+        self._bounds = [(int(c[0]), int(c[-1]) + 1) for c in np.array_split(np.arange(length), n_slabs)]
+
+    @property
+    def system(self) -> BravaisLatticeWithLoopDefects:
+        return self._system
+
+    @property
+    def n_slabs(self) -> int:
+        return self._n_slabs
+
+    @property
+    def halo(self) -> int:
+        return self._halo
+
+    @property
+    def bounds(self) -> List[Tuple[int, int]]:
+        return list(self._bounds)
+
+    def slab(self, rank: int) -> Slab:
+        start, stop = self._bounds[rank]
+        length = self._system.shape[0]
+        n_cells = min(stop - start + 2 * self._halo, length)
+        origin = ((start - self._halo) % length) * self._stride
+        return (start * self._stride, stop * self._stride, origin,
+                n_cells * self._stride, 2 * self._halo * self._stride)
+
+    def local_sites(self, rank: int) -> np.ndarray:
+        _, _, origin, n_local, _ = self.slab(rank)
+        return (origin + np.arange(n_local)) % self._system.size
+
+    def run(self,
+            simulator: LoopDefectSimulator,
+            n_sweeps: int = 1,
+            ) -> int:
+        system = self._system
+        if simulator.system is not system:
+            raise ValueError(f"Error: simulator does not run on the decomposed system!")
+        partitions = simulator.partitions
+        lattice_spec = dict(basis=[b.to_array() for b in system.basis], size=system.shape, **system.lattice_params)
+        params = dict(seed=simulator.seed,
+                      beta=simulator.beta,
+                      coupling=simulator.coupling,
+                      chemical_potential=simulator.chemical_potential)
+        with SharedArrays(dict(field=system.defect_field,
+                               occupancy=system.loop_occupancy,
+                               partition_nodes=np.concatenate(partitions),
+                               partition_offsets=np.cumsum([0] + [len(p) for p in partitions]),
+                               accepted=np.zeros(self._n_slabs, dtype=np.int64))) as shared:
+            context = mp.get_context()
+            barrier = context.Barrier(self._n_slabs)
+            workers = [context.Process(target=_sweep_slab,
+                                       args=(rank, lattice_spec, self.slab(rank), simulator.moves, params,
+                                             shared.descriptors, barrier, simulator.sweep_count, n_sweeps))
+                       for rank in range(self._n_slabs)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if any(worker.exitcode != 0 for worker in workers):
+                raise RuntimeError(f"Error: slab worker failed during sweep {simulator.sweep_count}!")
+            system.defect_field[...] = shared['field']
+            system.loop_occupancy[...] = shared['occupancy']
+            return int(shared['accepted'].sum())
@@ -1,9 +1,10 @@
-from typing import Union
+import numpy as np
+from typing import List, Union
 from loop_stats.bravais_lattice import LatticeInfo, LatticeInfoFactory
 
 
 class Defect3DInfo(LatticeInfo):
-    __slot__ = ['_x', '_y', '_z']
+    __slots__ = ['_x', '_y', '_z']
 
     def __init__(self,
                  x: int = 0,
@@ -54,7 +55,7 @@ class Defect3DInfo(LatticeInfo):
 
 
 class Defect2DInfo(LatticeInfo):
-    __slot__ = [ '_x', '_y']
+    __slots__ = ['_x', '_y']
 
     def __init__(self,
                  x: int = 0,
@@ -106,6 +107,13 @@ class DefectInfoFactory(LatticeInfoFactory):
     def ndim(self) -> int:
         return self._ndim
 
+    def keys(self) -> List[str]:
+        return ['x', 'y', 'z'][:self.ndim]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.int32)
+
     def get_instance(self, **kwargs) -> LatticeInfo:
         if self.ndim == 2:
             return Defect2DInfo(**kwargs)
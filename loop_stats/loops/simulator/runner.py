@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import resource
+import itertools
+import tracemalloc
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from loop_stats.bravais_lattice import get_basis_pair, BravaisLattice, LatticeCache
+from loop_stats.loops.defects import FundamentalLoopDefect
+from loop_stats.loops.observables import BinningAnalysis, Welford
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+from loop_stats.loops.simulator.simulator import LoopDefectSimulator
+from loop_stats.loops.simulator.utility import independent_node_partition
+
+
+LATTICE_KEYS = ('lattice_type', 'size', 'a_x', 'a_y', 'a_z', 'theta', 'alpha', 'beta', 'gamma')
+ArrayDescriptor = Tuple[str, Tuple[int, ...], str]
+LatticeKey = Tuple[Tuple[str, Any], ...]
+
+
+def parameter_grid(**axes: Sequence[Any]) -> List[Dict[str, Any]]:
+    names = list(axes.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[axes[n] for n in names])]
+
+
+def attach_shared_array(descriptor: ArrayDescriptor,
+                        writeable: bool = False,
+                        ) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = descriptor
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching registers the block again, with the resource tracker the
+        # workers share with the parent that owns and unlinks it
+        shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    array.flags.writeable = writeable
+    return shm, array
+
+
+class SharedArrays:
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks = dict()
+        self._descriptors = dict()
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            self._blocks[name] = shm
+            self._descriptors[name] = (shm.name, array.shape, array.dtype.str)
+
+    @property
+    def descriptors(self) -> Dict[str, ArrayDescriptor]:
+        return dict(self._descriptors)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        _, shape, dtype = self._descriptors[name]
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._blocks[name].buf)
+
+    def close(self):
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def lattice_parameters(point: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: point[k] for k in LATTICE_KEYS if k in point}
+
+
+def lattice_key(point: Dict[str, Any]) -> LatticeKey:
+    return tuple(sorted(lattice_parameters(point).items()))
+
+
+def build_lattice(point: Dict[str, Any],
+                  cache: LatticeCache = None,
+                  **kwargs) -> BravaisLattice:
+    params = lattice_parameters(point)
+    basis, centering = get_basis_pair(**params)
+    return BravaisLattice(basis, size=params['size'], cache=cache, show_progress=False, **centering, **kwargs)
+
+
+def _simulate(point: Dict[str, Any],
+              arrays: Dict[str, np.ndarray],
+              loop_group: List[FundamentalLoopDefect],
+              ) -> Dict[str, Any]:
+    params = lattice_parameters(point)
+    basis, centering = get_basis_pair(**params)
+    system = BravaisLatticeWithLoopDefects(basis, size=params['size'], show_progress=False,
+                                           arrays=arrays, **centering)
+    system.register_loop(loop_group)
+    offsets = arrays['partition_offsets']
+    partitions = [arrays['partition_nodes'][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    simulator = LoopDefectSimulator(system,
+                                    beta=point.get('inverse_temperature', 1.0),
+                                    coupling=point.get('coupling', 1.0),
+                                    chemical_potential=point.get('chemical_potential', 0.0),
+                                    seed=point.get('seed', 0),
+                                    partitions=partitions)
+    simulator.sweep(point.get('n_thermalize', 0))
+    loop_count, energy, density = BinningAnalysis(), BinningAnalysis(), Welford()
+    for _ in range(point.get('n_sweeps', 1)):
+        simulator.sweep()
+        loop_count.add(simulator.loop_count())
+        energy.add(simulator.energy())
+        density.add(np.count_nonzero(np.any(system.defect_field != 0, axis=1)) / system.size)
+    result = dict(point)
+    result.update(n_sites=system.size,
+                  n_colors=len(partitions),
+                  mean_loop_count=float(loop_count.mean),
+                  loop_count_error=float(loop_count.std_error()),
+                  loop_count_autocorrelation=float(loop_count.autocorrelation_time()),
+                  mean_energy=float(energy.mean),
+                  energy_error=float(energy.std_error()),
+                  mean_defect_density=float(density.mean),
+                  acceptance_rate=simulator.acceptance_rate,
+                  site_updates_per_second=simulator.site_updates_per_second)
+    return result
+
+
+def _run_point(point: Dict[str, Any],
+               descriptors: Dict[str, ArrayDescriptor],
+               loop_group: List[FundamentalLoopDefect],
+               trace_memory: bool = False,
+               measure_rss: bool = True,
+               ) -> Dict[str, Any]:
+    blocks, arrays = [], dict()
+    for name, descriptor in descriptors.items():
+        shm, arrays[name] = attach_shared_array(descriptor)
+        blocks.append(shm)
+    try:
+        start = time.perf_counter()
+        result = _simulate(point, arrays, loop_group)
+        result.update(wall_time=time.perf_counter() - start)
+        if trace_memory:
+            # memory in a separate run, tracing slows the timed sweeps down
+            tracemalloc.start()
+            try:
+                _simulate(point, arrays, loop_group)
+                result.update(peak_traced_bytes=tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+    finally:
+        arrays.clear()
+        for shm in blocks:
+            shm.close()
+    if measure_rss:
+        # the worker runs this point only, so its high-water mark is the point's peak; ru_maxrss is in
+        # kilobytes on linux and in bytes on macos
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result.update(max_rss_bytes=max_rss if sys.platform == 'darwin' else max_rss * 1024)
+    result.update(worker_pid=os.getpid())
+    return result
+
+
+class ScalingStudyRunner:
+    def __init__(self,
+                 loop_group: List[FundamentalLoopDefect],
+                 n_workers: int = None,
+                 cache: LatticeCache = None,
+                 balance: bool = True,
+                 trace_memory: bool = False,
+                 ):
+        self._loop_group = list(loop_group)
+        self._n_workers = n_workers
+        self._cache = cache
+        self._balance = balance
+        self._trace_memory = trace_memory
+
+    def _share_lattice(self, point: Dict[str, Any]) -> Tuple[SharedArrays, float]:
+        start = time.perf_counter()
+        lattice = build_lattice(point, cache=self._cache)
+        loops = [loop for loop in self._loop_group if loop.ndim == lattice.ndim]
+        partitions = independent_node_partition(lattice, loops, balance=self._balance,
+                                                overlap=True, cache=self._cache)
+        arrays = lattice.arrays
+        arrays.update(partition_nodes=np.concatenate(partitions),
+                      partition_offsets=np.cumsum([0] + [len(p) for p in partitions]))
+        shared = SharedArrays(arrays)
+        return shared, time.perf_counter() - start
+
+    def run(self, grid: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # points on the same lattice share one block, counted by the pending points that use it; a block
+        # nobody uses is released once the next point has taken its own, so a sweep over seeds or
+        # temperatures builds its lattice once and at most one lattice more than workers is alive
+        n_workers = self._n_workers or os.cpu_count() or 1
+        results, pending, shared = [None] * len(grid), dict(), dict()
+        try:
+            executor, fresh = self.__executor(n_workers)
+            with executor:
+                for i, point in enumerate(grid):
+                    if len(pending) >= n_workers:
+                        self.__collect(pending, shared, results, wait(pending, return_when=FIRST_COMPLETED).done)
+                    key = lattice_key(point)
+                    build_time = 0.0
+                    if key not in shared:
+                        arrays, build_time = self._share_lattice(point)
+                        shared[key] = [arrays, 0]
+                    shared[key][1] += 1
+                    for unused in [k for k, (_, n) in shared.items() if n == 0]:
+                        shared.pop(unused)[0].close()
+                    future = executor.submit(_run_point, point, shared[key][0].descriptors, self._loop_group,
+                                             self._trace_memory, fresh)
+                    pending[future] = (i, key, build_time)
+                self.__collect(pending, shared, results, wait(pending).done)
+        finally:
+            for arrays, _ in shared.values():
+                arrays.close()
+        return results
+
+    @staticmethod
+    def __executor(n_workers: int) -> Tuple[ProcessPoolExecutor, bool]:
+        # a fresh worker per point keeps the peak rss of one point from leaking into the next
+        try:
+            return ProcessPoolExecutor(max_workers=n_workers, max_tasks_per_child=1), True
+        except TypeError:
+            # before python 3.11 workers are reused, and their lifetime peak says nothing about a point
+            return ProcessPoolExecutor(max_workers=n_workers), False
+
+    @staticmethod
+    def __collect(pending: Dict[Future, Tuple[int, LatticeKey, float]],
+                  shared: Dict[LatticeKey, List[Any]],
+                  results: List[Dict[str, Any]],
+                  done: Set[Future]):
+        for future in done:
+            i, key, build_time = pending.pop(future)
+            shared[key][1] -= 1
+            results[i] = future.result()
+            results[i]['lattice_build_time'] = build_time
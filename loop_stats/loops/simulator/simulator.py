@@ -0,0 +1,246 @@
+import time
+import numpy as np
+from typing import TYPE_CHECKING, List, Tuple
+from loop_stats.bravais_lattice import BravaisLattice, LatticeCache
+from loop_stats.instrumentation import get_instrumentation, timer, count
+from loop_stats.loops.simulator.system import BravaisLatticeWithLoopDefects
+from loop_stats.loops.simulator.utility import independent_node_partition
+
+if TYPE_CHECKING:
+    from loop_stats.loops.simulator.decomposition import SlabDecomposition
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_uniform(seed: int,
+                    sweep: int,
+                    sites: np.ndarray,
+                    n_streams: int,
+                    ) -> np.ndarray:
+    # counter based draws keyed by (seed, sweep, site, stream): a site sees the same numbers whatever
+    # order, partition or process it is updated in
+    key = _splitmix64(np.array([seed, sweep], dtype=np.uint64))
+    key = _splitmix64(key[:1] ^ key[1:])
+    counters = (np.asarray(sites, dtype=np.uint64)[:, None] * np.uint64(n_streams) +
+                np.arange(n_streams, dtype=np.uint64)[None, :])
+    bits = _splitmix64(_splitmix64(counters) ^ key)
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def compile_loop_moves(system: BravaisLatticeWithLoopDefects) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_loops = system.known_loop_count
+    if n_loops == 0:
+        raise ValueError(f"Error: no loops registered on the lattice!")
+    touched, vectors = [], []
+    for i in range(n_loops):
+        # a loop anchored at s walks the vertices s + p_i, step o_i is the bond from vertex i to i + 1;
+        # every bond adds its step to both of its end vertices, so vertex i carries o_(i-1) + o_i and
+        # the reversed loop writes exactly the negated field
+        loop = system.registered_loop(i)
+        path, stencil = loop.path.astype(np.int64), loop.stencil.astype(np.int64)
+        offsets, inverse = np.unique(path, axis=0, return_inverse=True)
+        summed = np.zeros_like(offsets)
+        np.add.at(summed, inverse.ravel(), np.roll(stencil, 1, axis=0) + stencil)
+        touched.append(offsets)
+        vectors.append(summed)
+    width = max(len(t) for t in touched)
+    offsets = np.zeros((n_loops, width, system.ndim), dtype=np.int64)
+    steps = np.zeros((n_loops, width, system.ndim), dtype=np.int64)
+    mask = np.zeros((n_loops, width), dtype=bool)
+    for i, (t, v) in enumerate(zip(touched, vectors)):
+        offsets[i, :len(t)] = t
+        steps[i, :len(v)] = v
+        mask[i, :len(t)] = True
+    return offsets, steps, mask
+
+
+def draw_moves(seed: int,
+               sweep: int,
+               anchors: np.ndarray,
+               n_loops: int,
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    u = counter_uniform(seed, sweep, anchors, 3)
+    loop_id = np.minimum((u[:, 0] * n_loops).astype(np.intp), n_loops - 1)
+    sign = np.where(u[:, 1] < 0.5, 1, -1)
+    return loop_id, sign, u[:, 2]
+
+
+def place_moves(lattice: BravaisLattice,
+                anchors: np.ndarray,
+                loop_id: np.ndarray,
+                sign: np.ndarray,
+                moves: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offsets, steps, mask = moves
+    coordinates = lattice.doubled_coordinate_at(anchors).astype(np.int64)
+    touched = lattice.index_of(coordinates[:, None, :] + offsets[loop_id], doubled=True)
+    mask = mask[loop_id]
+    placeable = np.all(~mask | (touched >= 0), axis=1)
+    # padded and missing entries point at the anchor with a zero step, which leaves it untouched
+    touched = np.where(mask & (touched >= 0), touched, anchors[:, None])
+    return placeable, touched, steps[loop_id] * sign[:, None, None]
+
+
+def accept_moves(field: np.ndarray,
+                 steps: np.ndarray,
+                 sign: np.ndarray,
+                 present: np.ndarray,
+                 placeable: np.ndarray,
+                 u: np.ndarray,
+                 beta: float,
+                 coupling: float,
+                 chemical_potential: float,
+                 ) -> np.ndarray:
+    delta = 0.25 * coupling * np.sum(2 * field * steps + steps * steps, axis=(1, 2)) + sign * chemical_potential
+    with np.errstate(divide='ignore'):
+        return placeable & ((sign > 0) | present) & (np.log(u) < -beta * delta)
+
+
+class LoopDefectSimulator:
+    def __init__(self,
+                 system: BravaisLatticeWithLoopDefects,
+                 beta: float = 1.0,
+                 coupling: float = 1.0,
+                 chemical_potential: float = 0.0,
+                 seed: int = 0,
+                 partitions: List[np.ndarray] = None,
+                 balance: bool = True,
+                 cache: LatticeCache = None,
+                 ):
+        self._system = system
+        self._beta = float(beta)
+        self._coupling = float(coupling)
+        self._mu = float(chemical_potential)
+        self._seed = int(seed)
+        self._balance = balance
+        self._offsets, self._steps, self._mask = compile_loop_moves(system)
+        if partitions is None:
+            partitions = independent_node_partition(system, system.loop_group,
+                                                    balance=balance, overlap=True, cache=cache)
+        self._partitions = [np.asarray(p, dtype=np.intp) for p in partitions]
+        self._sweep_count = 0
+        self._proposed = 0
+        self._accepted = 0
+        self._elapsed = 0.
+
+    @property
+    def system(self) -> BravaisLatticeWithLoopDefects:
+        return self._system
+
+    @property
+    def partitions(self) -> List[np.ndarray]:
+        return self._partitions
+
+    @property
+    def moves(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self._offsets, self._steps, self._mask
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def beta(self) -> float:
+        return self._beta
+
+    @property
+    def coupling(self) -> float:
+        return self._coupling
+
+    @property
+    def chemical_potential(self) -> float:
+        return self._mu
+
+    @property
+    def sweep_count(self) -> int:
+        return self._sweep_count
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self._accepted / self._proposed if self._proposed > 0 else 0.
+
+    @property
+    def site_updates_per_second(self) -> float:
+        return self._proposed / self._elapsed if self._elapsed > 0 else 0.
+
+    def to_dict(self) -> dict:
+        return dict(seed=self._seed,
+                    beta=self._beta,
+                    coupling=self._coupling,
+                    chemical_potential=self._mu,
+                    balance=self._balance,
+                    sweep_count=self._sweep_count,
+                    proposed=self._proposed,
+                    accepted=self._accepted,
+                    elapsed=self._elapsed)
+
+    def load_dict(self, **kwargs):
+        # the draws are keyed by (seed, sweep), so the sweep counter is all the generator state there is
+        self._sweep_count = int(kwargs.get('sweep_count', self._sweep_count))
+        self._proposed = int(kwargs.get('proposed', self._proposed))
+        self._accepted = int(kwargs.get('accepted', self._accepted))
+        self._elapsed = float(kwargs.get('elapsed', self._elapsed))
+
+    def energy(self) -> float:
+        field = self._system.defect_field
+        # the field is kept in doubled units
+        return (0.25 * self._coupling * float(np.sum(field.astype(float) ** 2)) +
+                self._mu * float(self._system.loop_occupancy.sum()))
+
+    def loop_count(self) -> int:
+        return int(self._system.loop_occupancy.sum())
+
+    def propose(self,
+                anchors: np.ndarray,
+                sweep: int,
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        system = self._system
+        loop_id, sign, u = draw_moves(self._seed, sweep, anchors, self._offsets.shape[0])
+        placeable, touched, steps = place_moves(system, anchors, loop_id, sign, self.moves)
+        accept = accept_moves(system.defect_field[touched], steps, sign,
+                              system.loop_occupancy[anchors, loop_id] > 0, placeable, u,
+                              self._beta, self._coupling, self._mu)
+        return accept, loop_id, sign, touched, steps
+
+    def update_class(self,
+                     anchors: np.ndarray,
+                     sweep: int,
+                     ) -> int:
+        with timer('sweep.propose'):
+            accept, loop_id, sign, touched, steps = self.propose(anchors, sweep)
+        system = self._system
+        with timer('sweep.apply'):
+            system.info_update_many(touched[accept].ravel(), system.info_keys,
+                                    steps[accept].reshape(-1, system.ndim))
+            np.add.at(system.loop_occupancy, (anchors[accept], loop_id[accept]), sign[accept])
+        return int(accept.sum())
+
+    def sweep(self,
+              n_sweeps: int = 1,
+              decomposition: "SlabDecomposition" = None,
+              ) -> int:
+        accepted, proposed = 0, self._proposed
+        start = time.perf_counter()
+        if decomposition is not None:
+            # the slab workers draw from the same counter based streams, so the result does not change
+            accepted += decomposition.run(self, n_sweeps)
+            self._proposed += n_sweeps * sum(len(anchors) for anchors in self._partitions)
+            self._sweep_count += n_sweeps
+        else:
+            for _ in range(n_sweeps):
+                for anchors in self._partitions:
+                    accepted += self.update_class(anchors, self._sweep_count)
+                    self._proposed += len(anchors)
+                self._sweep_count += 1
+        elapsed = time.perf_counter() - start
+        get_instrumentation().record('sweep.decomposed' if decomposition is not None else 'sweep', elapsed, n_sweeps)
+        count('sweep.proposed', self._proposed - proposed)
+        count('sweep.accepted', accepted)
+        self._elapsed += elapsed
+        self._accepted += accepted
+        return accepted
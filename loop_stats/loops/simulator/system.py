@@ -1,12 +1,14 @@
 import numpy as np
 from typing import Tuple, Union, List
 from loop_stats.bravais_lattice.typing import LatticeSize
-from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.bravais_lattice import BravaisSystem
 from loop_stats.bravais_lattice import BasisVector
 from loop_stats.loops.defects import FundamentalLoopDefect
+from loop_stats.loops.registry import LoopRegistry
+from loop_stats.loops.simulator.info import DefectInfoFactory
 
 
-class BravaisLatticeWithLoopDefects(BravaisLattice):
+class BravaisLatticeWithLoopDefects(BravaisSystem):
     def __init__(self,
                  basis: Tuple[BasisVector, ...],
                  size: Union[int, LatticeSize],
@@ -18,13 +20,14 @@ class BravaisLatticeWithLoopDefects(BravaisLattice):
                  ):
         super(BravaisLatticeWithLoopDefects, self).__init__(basis=basis,
                                                             size=size,
+                                                            info_factory=DefectInfoFactory(len(basis)),
                                                             body_centered=body_centered,
                                                             xy_face_centered=xy_face_centered,
                                                             yz_face_centered=yz_face_centered,
                                                             xz_face_centered=xz_face_centered,
                                                             **kwargs)
-        self._info_list = np.zeros((self.size, self.ndim))
-        self._loop_register = []
+        self._loop_occupancy = np.zeros((self.size, 0), dtype=np.int32)
+        self._loop_register = LoopRegistry()
 
     def register_loop(self,
                       loops: Union[FundamentalLoopDefect, List[FundamentalLoopDefect]]):
@@ -32,8 +35,34 @@ class BravaisLatticeWithLoopDefects(BravaisLattice):
             loops = [loops]
 
         for loop in loops:
-            if (loop not in self._loop_register) and (loop.ndim == self.ndim):
-                self._loop_register.append(loop)
+            if loop.ndim == self.ndim:
+                self._loop_register.add(loop)
+        self.__grow_occupancy()
+
+    def register_orbit(self,
+                       loops: Union[FundamentalLoopDefect, List[FundamentalLoopDefect]]):
+        if not isinstance(loops, (list, tuple)):
+            loops = [loops]
+
+        if self._loop_register.point_group is None:
+            self._loop_register.point_group = self.point_group
+        for loop in loops:
+            if loop.ndim == self.ndim:
+                self._loop_register.add_orbit(loop)
+        self.__grow_occupancy()
+
+    def __grow_occupancy(self):
+        extra = len(self._loop_register) - self._loop_occupancy.shape[1]
+        if extra > 0:
+            self._loop_occupancy = np.concatenate([self._loop_occupancy,
+                                                   np.zeros((self.size, extra), dtype=np.int32)], axis=1)
+
+    def loop_index(self, loop: FundamentalLoopDefect) -> int:
+        return self._loop_register.index(loop)
+
+    @property
+    def loop_registry(self) -> LoopRegistry:
+        return self._loop_register
 
     @property
     def known_loop_count(self) -> int:
@@ -42,4 +71,14 @@ class BravaisLatticeWithLoopDefects(BravaisLattice):
     def registered_loop(self, item: int) -> FundamentalLoopDefect:
         return self._loop_register[item]
 
-    
+    @property
+    def loop_group(self) -> List[FundamentalLoopDefect]:
+        return list(self._loop_register)
+
+    @property
+    def defect_field(self) -> np.ndarray:
+        return self.info_array
+
+    @property
+    def loop_occupancy(self) -> np.ndarray:
+        return self._loop_occupancy
@@ -1,15 +1,24 @@
-from typing import List, Union, Callable
+from typing import Dict, List, Union, Callable
 
-import networkx as nx
 import numpy as np
-from tqdm import tqdm
+import scipy.sparse as sp
 
-from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.bravais_lattice import BravaisLattice, LatticeCache
 from loop_stats.bravais_lattice import (LatticeCoordinate,
                                         check_coordinate_validity,
-                                        to_lattice_coordinate)
+                                        check_coordinate_validity_batch,
+                                        from_doubled)
 from loop_stats.bravais_lattice.typing import CoordinateTuple
-from loop_stats.loops.defects import FundamentalLoopDefect, generate_defect_coordinates
+from loop_stats.instrumentation import Progress, ProgressCallback, timer
+from loop_stats.loops.defects import FundamentalLoopDefect, group_stencil, overlap_stencil
+from loop_stats.loops.simulator.coloring import (conflict_graph,
+                                                 jones_plassmann_coloring,
+                                                 rebalance_colors,
+                                                 color_classes)
+
+
+# bumped whenever the partitions change for the same arguments, so cached partitions are not reused
+PARTITION_VERSION: int = 3
 
 
 class LatticeCoordinateValidityChecker:
@@ -22,49 +31,195 @@ class LatticeCoordinateValidityChecker:
                            xz_face_centered=lattice.xz_face_centered)
 
     def validate(self,
-                 coord: Union[CoordinateTuple, LatticeCoordinate],
-                 ) -> bool:
+                 coord: Union[CoordinateTuple, LatticeCoordinate, np.ndarray],
+                 ) -> Union[bool, np.ndarray]:
+        if isinstance(coord, np.ndarray) and coord.ndim == 2:
+            return self.validate_many(coord)
         return check_coordinate_validity(coord, **self.config)
 
+    def validate_many(self,
+                      coords: np.ndarray,
+                      doubled: bool = False,
+                      ) -> np.ndarray:
+        return check_coordinate_validity_batch(coords, doubled=doubled, **self.config)
+
     def __call__(self,
-                 coord: Union[CoordinateTuple, LatticeCoordinate],
-                 ) -> bool:
+                 coord: Union[CoordinateTuple, LatticeCoordinate, np.ndarray],
+                 ) -> Union[bool, np.ndarray]:
         return self.validate(coord)
 
 
+def conflict_stencil(loop_group: List[FundamentalLoopDefect],
+                     overlap: bool = False,
+                     ) -> np.ndarray:
+    if overlap:
+        return overlap_stencil(loop_group)
+    # the anchor is a vertex of its own loop, the zero offset is no conflict
+    stencil = group_stencil(loop_group)
+    return stencil[np.any(stencil != 0, axis=1)]
+
+
+def loop_neighbor_table(lattice: BravaisLattice,
+                        loop_group: List[FundamentalLoopDefect],
+                        valid: np.ndarray = None,
+                        overlap: bool = False,
+                        include_anchor: bool = False,
+                        chunk_size: int = 1 << 18,
+                        ) -> sp.csr_matrix:
+    """Row s lists the sites j != s that a loop of the group anchored at s touches, or with overlap the
+    anchors j != s whose loops share a site with a loop at s; include_anchor adds s itself to its row."""
+    stencil = conflict_stencil(loop_group, overlap)
+    if include_anchor:
+        stencil = np.concatenate([np.zeros((1, stencil.shape[1]), dtype=stencil.dtype), stencil])
+    if stencil.shape[1] != lattice.ndim:
+        raise ValueError(f"Error: loop group incompatible with {lattice.ndim}D lattice!")
+    counts, columns = [], []
+    with timer('partition.neighbor_table'):
+        for indices, coordinates, _, _ in lattice.iter_chunks(chunk_size):
+            neighbors = lattice.index_of(coordinates[:, None, :] + stencil[None, :, :], doubled=True)
+            keep = neighbors >= 0
+            if valid is not None:
+                keep &= valid[np.maximum(neighbors, 0)] & valid[indices][:, None]
+            counts.append(keep.sum(axis=1))
+            columns.append(neighbors[keep])
+    indptr = np.concatenate([[0], np.cumsum(np.concatenate(counts))])
+    table = sp.csr_matrix((np.ones(indptr[-1], dtype=np.int8), np.concatenate(columns), indptr),
+                          shape=(lattice.size, lattice.size))
+    table.sum_duplicates()
+    table.data[:] = 1
+    return table
+
+
+def is_conflict_free(lattice: BravaisLattice,
+                     loop_group: List[FundamentalLoopDefect],
+                     partitions: List[np.ndarray],
+                     overlap: bool = False,
+                     chunk_size: int = 1 << 18,
+                     ) -> bool:
+    colors = np.full(lattice.size, -1, dtype=np.intp)
+    for c, nodes in enumerate(partitions):
+        colors[nodes] = c
+    stencil = conflict_stencil(loop_group, overlap)
+    for indices, coordinates, _, _ in lattice.iter_chunks(chunk_size):
+        for offset in stencil:
+            j = lattice.index_of(coordinates + offset, doubled=True)
+            clash = ((j >= 0) & (j != indices) & (colors[indices] >= 0) &
+                     (colors[np.maximum(j, 0)] == colors[indices]))
+            if np.any(clash):
+                return False
+    return True
+
+
+def _supercell_candidates(lattice: BravaisLattice,
+                          stencil: np.ndarray,
+                          max_candidates: int,
+                          ) -> List[tuple]:
+    extent = np.abs(stencil).max(axis=0) // 2 + 1
+    per_axis = [[p for p in range(1, s + 1) if (s % p == 0) and (p <= 4 * e + 2)]
+                for s, e in zip(lattice.shape, extent)]
+    candidates = []
+    for shape in np.stack(np.meshgrid(*per_axis, indexing='ij'), axis=-1).reshape(-1, lattice.ndim):
+        shape = tuple(int(p) for p in shape)
+        if shape == tuple(lattice.shape):
+            continue
+        # a supercell in which some offset wraps onto itself cannot be colored
+        if np.any(np.all(stencil % (2 * np.array(shape)) == 0, axis=1)):
+            continue
+        candidates.append(shape)
+    return sorted(candidates, key=lambda sc: (np.prod(sc), sc))[:max_candidates]
+
+
+def periodic_node_partition(lattice: BravaisLattice,
+                            loop_group: List[FundamentalLoopDefect],
+                            balance: bool = False,
+                            overlap: bool = False,
+                            max_candidates: int = 16,
+                            seed: int = 0,
+                            ) -> Union[List[np.ndarray], None]:
+    stencil = conflict_stencil(loop_group, overlap)
+    best = None
+    for shape in _supercell_candidates(lattice, stencil, max_candidates):
+        cell = BravaisLattice(lattice.basis, size=shape, show_progress=False, **lattice.lattice_params)
+        table = loop_neighbor_table(cell, loop_group, overlap=overlap)
+        if np.any(table.diagonal()):
+            continue
+        adjacency = conflict_graph(table)
+        colors = jones_plassmann_coloring(adjacency, seed=seed)
+        if (best is None) or (colors.max() < best[2].max()):
+            best = (cell, adjacency, colors)
+    if best is None:
+        return None
+
+    cell, adjacency, colors = best
+    if balance:
+        colors = rebalance_colors(adjacency, colors)
+    # tile the supercell colors over the (sublattice, i, j[, k]) grid, which is site ordered
+    reps = (1,) + tuple(s // p for s, p in zip(lattice.shape, cell.shape))
+    tiled = np.tile(colors[cell.site_table], reps)
+    partitions = color_classes(np.moveaxis(tiled, 0, -1).ravel())
+    if not is_conflict_free(lattice, loop_group, partitions, overlap=overlap):
+        return None
+    return partitions
+
+
 def independent_node_partition(lattice: BravaisLattice,
                                loop_group: List[FundamentalLoopDefect],
                                coordinate_checker: Union[Callable, LatticeCoordinateValidityChecker] = None,
-                               ):
-    if coordinate_checker is None:
-        coordinate_checker = LatticeCoordinateValidityChecker(lattice)
-    valid_nodes = []
-    coord_index = dict()
-    counter = 0
-    for i in tqdm(range(lattice.size), desc="Building Lattice Graph"):
-        c = to_lattice_coordinate(lattice.coordinate[i])
-        if coordinate_checker(c):
-            coord_index[c] = (counter, i)
-            counter = counter + 1
-            valid_nodes.append(i)
-
-    neighbor_edges = []
-
-    for c in tqdm(coord_index, desc="Building Neighborhood Graph"):
-        current_index = coord_index[c][1]
-        lattice_neighbors = []
-        for d in loop_group:
-            neighbors = generate_defect_coordinates(d, c, lattice_size=lattice.shape)
-            lattice_neighbors += [coord_index.get(c_, (-1, -1))[1] for c_ in neighbors]
-        lattice_neighbors = [(current_index, j) for j in np.unique(lattice_neighbors) if j >= 0 and j > current_index]
-        neighbor_edges += lattice_neighbors
-
-    g = nx.Graph()
-    g.add_nodes_from(valid_nodes)
-    g.add_edges_from(neighbor_edges)
-    colors = nx.greedy_color(g)
-    uniq_colors = np.unique(list(colors.values()))
-    node_partitions = list()
-    for c in uniq_colors:
-        node_partitions.append([k for k in colors if colors[k] == c])
-    return node_partitions
+                               use_symmetry: bool = True,
+                               balance: bool = False,
+                               overlap: bool = False,
+                               seed: int = 0,
+                               cache: LatticeCache = None,
+                               show_progress: Union[bool, ProgressCallback] = True,
+                               ) -> List[np.ndarray]:
+    if (cache is not None) and (coordinate_checker is None):
+        key = lattice.cache_key(loop_group,
+                                partition='independent_node_partition',
+                                version=PARTITION_VERSION,
+                                use_symmetry=use_symmetry,
+                                balance=balance,
+                                overlap=overlap,
+                                seed=seed)
+
+        def build() -> Dict[str, np.ndarray]:
+            partitions = independent_node_partition(lattice, loop_group,
+                                                    use_symmetry=use_symmetry,
+                                                    balance=balance,
+                                                    overlap=overlap,
+                                                    seed=seed)
+            return dict(partition_nodes=np.concatenate(partitions),
+                        partition_offsets=np.cumsum([0] + [len(p) for p in partitions]))
+
+        arrays = cache.load_or_build(key, build)
+        offsets = arrays['partition_offsets']
+        return [arrays['partition_nodes'][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    if use_symmetry and (coordinate_checker is None):
+        with timer('partition.periodic'):
+            partitions = periodic_node_partition(lattice, loop_group, balance=balance, overlap=overlap,
+                                                 seed=seed)
+        if partitions is not None:
+            return partitions
+
+    valid = np.zeros(lattice.size, dtype=bool)
+    with timer('partition.validity_check'):
+        if coordinate_checker is None:
+            for indices, coordinates, _, _ in lattice.iter_chunks():
+                valid[indices] = lattice.check_coordinates(coordinates, doubled=True)
+        elif isinstance(coordinate_checker, LatticeCoordinateValidityChecker):
+            for indices, coordinates, _, _ in lattice.iter_chunks():
+                valid[indices] = coordinate_checker.validate_many(coordinates, doubled=True)
+        else:
+            with Progress(lattice.size, "Building Lattice Graph", callback=show_progress) as progress:
+                for i in range(lattice.size):
+                    valid[i] = coordinate_checker(from_doubled(lattice.doubled_coordinate_at(i)))
+                    progress.update(1)
+    valid_nodes = np.flatnonzero(valid)
+
+    table = loop_neighbor_table(lattice, loop_group, valid=valid, overlap=overlap)
+    with timer('partition.coloring'):
+        adjacency = conflict_graph(table)[valid_nodes][:, valid_nodes]
+        colors = jones_plassmann_coloring(adjacency, seed=seed)
+        if balance:
+            colors = rebalance_colors(adjacency, colors)
+    return color_classes(colors, valid_nodes)
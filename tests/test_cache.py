@@ -0,0 +1,75 @@
+import os
+import numpy as np
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice, LatticeCache
+from loop_stats.loops import FundamentalLoopDefect, anti_cycle
+from loop_stats.loops.simulator import independent_node_partition
+
+
+def test_store_and_load_memory_maps(tmp_path):
+    cache = LatticeCache(str(tmp_path))
+    cache.store("entry", dict(a=np.arange(10), b=np.eye(3)))
+    arrays = cache.load("entry")
+    assert isinstance(arrays["a"], np.memmap)
+    assert np.array_equal(arrays["a"], np.arange(10))
+    assert np.array_equal(arrays["b"], np.eye(3))
+    assert cache.load("missing") is None
+    assert cache.keys() == ["entry"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    array = np.zeros(1000)
+    cache = LatticeCache(str(tmp_path), max_bytes=int(2.5 * array.nbytes))
+    for i, key in enumerate(["a", "b"]):
+        cache.store(key, dict(x=array))
+        os.utime(os.path.join(cache.directory, key), (i, i))
+    # reading a touches it, so b is now the least recently used
+    cache.load("a")
+    cache.store("c", dict(x=array))
+    assert sorted(cache.keys()) == ["a", "c"]
+    assert cache.total_bytes <= cache.max_bytes
+    assert not [f for f in os.listdir(cache.directory) if f.startswith('.')]
+
+
+def test_cached_lattice_and_partition_match_uncached(tmp_path):
+    cache = LatticeCache(str(tmp_path))
+    bases, params = get_basis_pair("D2C")
+    built = BravaisLattice(bases, size=6, show_progress=False, **params)
+    stored = BravaisLattice(bases, size=6, show_progress=False, cache=cache, **params)
+    loaded = BravaisLattice(bases, size=6, show_progress=False, cache=cache, **params)
+    assert isinstance(loaded.xyz, np.memmap)
+    for lattice in (stored, loaded):
+        assert np.array_equal(lattice.xyz, built.xyz)
+        assert np.array_equal(lattice.doubled_coordinate, built.doubled_coordinate)
+        assert np.array_equal(lattice.site_types, built.site_types)
+
+    loop = FundamentalLoopDefect([(0.5, 0.5), (0.5, -0.5), (-0.5, -0.5), (-0.5, 0.5)])
+    expected = independent_node_partition(built, [loop, anti_cycle(loop)], show_progress=False)
+    for _ in range(2):
+        partitions = independent_node_partition(loaded, [loop, anti_cycle(loop)], cache=cache)
+        assert len(partitions) == len(expected)
+        assert all(np.array_equal(p, q) for p, q in zip(partitions, expected))
+    assert len(cache.keys()) == 2
+
+
+def test_load_or_build_builds_once_and_survives_eviction(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return dict(x=np.arange(5))
+
+    cache = LatticeCache(str(tmp_path))
+    assert isinstance(cache.load_or_build("entry", build)["x"], np.memmap)
+    assert np.array_equal(cache.load_or_build("entry", build)["x"], np.arange(5))
+    assert len(calls) == 1
+
+    class EvictedCache(LatticeCache):
+        # another process evicts every entry right after it is stored
+        def store(self, key, arrays):
+            super().store(key, arrays)
+            self.remove(key)
+
+    arrays = EvictedCache(str(tmp_path)).load_or_build("other", build)
+    assert np.array_equal(arrays["x"], np.arange(5))
+    assert len(calls) == 2
@@ -0,0 +1,96 @@
+import collections
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.loops import FundamentalLoopDefect, anti_cycle
+from loop_stats.loops.clusters import cluster_loop_counts, cluster_windings, label_clusters
+from loop_stats.loops.simulator import BravaisLatticeWithLoopDefects
+
+
+LATTICES = [("D2", 5, [(0, 1), (1, 0), (0, -1), (-1, 0)]),
+            ("D2C", 3, [(0.5, 0.5), (0.5, -0.5), (-0.5, -0.5), (-0.5, 0.5)]),
+            ("OhF", 3, [(0.5, 0.5, 0), (0, -0.5, 0.5), (-0.5, 0, -0.5)])]
+
+
+def random_system(lattice_type, size, offsets, rng):
+    bases, params = get_basis_pair(lattice_type)
+    system = BravaisLatticeWithLoopDefects(bases, size=size, show_progress=False, **params)
+    loop = FundamentalLoopDefect(offsets)
+    system.register_loop([loop, anti_cycle(loop)])
+    system.loop_occupancy[...] = rng.random(system.loop_occupancy.shape) < rng.uniform(0.05, 0.4)
+    return system
+
+
+def breadth_first_search(system):
+    # breadth first search over the bonds of every placed loop, positions unwrapped along the search
+    adjacency = collections.defaultdict(list)
+    coordinates = system.doubled_coordinate.astype(np.int64)
+    for site, loop_id in zip(*np.nonzero(system.loop_occupancy)):
+        loop = system.registered_loop(int(loop_id))
+        vertices = system.index_of(coordinates[site] + loop.path.astype(np.int64), doubled=True)
+        for a, b, step in zip(vertices, np.roll(vertices, -1), loop.stencil.astype(np.int64)):
+            adjacency[int(a)].append((int(b), step))
+            adjacency[int(b)].append((int(a), -step))
+    position, clusters = dict(), []
+    for root in sorted(adjacency):
+        if root in position:
+            continue
+        position[root] = np.zeros(system.ndim, dtype=np.int64)
+        queue, members = collections.deque([root]), [root]
+        while queue:
+            u = queue.popleft()
+            for v, step in adjacency[u]:
+                if v not in position:
+                    position[v] = position[u] + step
+                    queue.append(v)
+                    members.append(v)
+        clusters.append(members)
+    return adjacency, position, clusters
+
+
+def reference_windings(system):
+    adjacency, position, clusters = breadth_first_search(system)
+    period = 2 * np.array(system.shape)
+    found = []
+    for members in clusters:
+        winding = np.zeros(system.ndim, dtype=np.int64)
+        for u in members:
+            for v, step in adjacency[u]:
+                winding = np.gcd(winding, np.abs(position[u] + step - position[v]) // period)
+        unwrapped = np.array([position[u] for u in members])
+        extent = unwrapped.max(axis=0) - unwrapped.min(axis=0)
+        found.append((len(members), tuple(winding.tolist()), tuple(((winding > 0) | (extent >= period - 2)).tolist())))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+def test_clusters_match_breadth_first_search(lattice_type, size, offsets):
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        system = random_system(lattice_type, size, offsets, rng)
+        labels, sizes = label_clusters(system)
+        _, _, expected = breadth_first_search(system)
+        assert sorted(sizes.tolist()) == sorted(len(members) for members in expected)
+        assert cluster_loop_counts(system, labels).sum() == np.count_nonzero(system.loop_occupancy)
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+def test_windings_match_breadth_first_search(lattice_type, size, offsets):
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        system = random_system(lattice_type, size, offsets, rng)
+        _, sizes, winding, spans = cluster_windings(system)
+        found = sorted((int(n), tuple(w.tolist()), tuple(s.tolist())) for n, w, s in zip(sizes, winding, spans))
+        assert found == reference_windings(system)
+
+
+def test_winding_straight_chain():
+    bases, params = get_basis_pair("D2")
+    system = BravaisLatticeWithLoopDefects(bases, size=6, show_progress=False, **params)
+    system.register_loop([FundamentalLoopDefect([(0, 1), (1, 0), (0, -1), (-1, 0)])])
+    for x in range(6):
+        system.loop_occupancy[system.index_of(np.array([x, 0])), 0] = 1
+    _, sizes, winding, spans = cluster_windings(system)
+    assert sizes.tolist() == [12]
+    assert winding.tolist() == [[1, 0]]
+    assert spans.tolist() == [[True, False]]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.loops.correlation import CorrelationAnalysis
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D6", (5, 6)), ("D2C", 6), ("OhF", (4, 3, 5))])
+def test_structure_factor_matches_direct_sum(lattice_type, size):
+    rng = np.random.default_rng(1)
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=size, show_progress=False, **params)
+    analysis = CorrelationAnalysis(lattice)
+    values = rng.normal(size=(lattice.size, 2)) + 1.
+    positions = (lattice.doubled_coordinate / 2) @ lattice.basis_matrix
+    frequencies = [np.fft.fftfreq(n) for n in lattice.shape[:-1]] + [np.fft.rfftfreq(lattice.shape[-1])]
+    for subtract_mean in (True, False):
+        s = analysis.structure_factor(values, subtract_mean=subtract_mean)
+        centered = values - values.mean(axis=0) if subtract_mean else values
+        for index in [(0,) * lattice.ndim] + [tuple(rng.integers(0, n) for n in s.shape) for _ in range(5)]:
+            m = np.array([frequencies[i][j] for i, j in enumerate(index)])
+            k = 2 * np.pi * np.linalg.inv(lattice.basis_matrix) @ m
+            rho = (centered * np.exp(-1j * positions @ k)[:, None]).sum(axis=0)
+            assert np.isclose(s[index], (np.abs(rho) ** 2).sum() / lattice.size)
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D4", 32), ("D6", 24), ("OhF", 8)])
+def test_correlation_length_ignores_the_bragg_peak(lattice_type, size):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=size, show_progress=False, **params)
+    analysis = CorrelationAnalysis(lattice)
+    xi = 2.5
+    s = 1. / (1 + (xi * analysis.wavevector_norms * np.ones(analysis.spectrum_shape)) ** 2)
+    assert analysis.correlation_length(s) == pytest.approx(xi)
+    # the constant part of a field only reaches k = 0, which the estimate never reads
+    s[(0,) * lattice.ndim] += lattice.size * 25.
+    assert analysis.correlation_length(s) == pytest.approx(xi)
+
+
+def test_subtracted_mean_leaves_k_nonzero_untouched():
+    rng = np.random.default_rng(0)
+    bases, params = get_basis_pair("D2C")
+    lattice = BravaisLattice(bases, size=8, show_progress=False, **params)
+    analysis = CorrelationAnalysis(lattice)
+    values = rng.normal(size=(lattice.size, 3))
+    centered = analysis.structure_factor(values + 5.)
+    raw = analysis.structure_factor(values + 5., subtract_mean=False)
+    assert centered[0, 0] == pytest.approx(0., abs=1e-8)
+    assert np.allclose(centered.ravel()[1:], raw.ravel()[1:])
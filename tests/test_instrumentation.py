@@ -0,0 +1,42 @@
+import io
+from loop_stats.instrumentation import Progress, LogProgress
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_reports_by_time_and_on_completion():
+    clock, calls = FakeClock(), []
+    with Progress(64, "slabs", callback=lambda *args: calls.append(args), clock=clock) as progress:
+        for i in range(64):
+            # one slab every 0.125 s, so at most one report per 8 slabs
+            clock.now += 0.125
+            progress.update()
+    assert [done for done, _, _ in calls] == [8, 16, 24, 32, 40, 48, 56, 64]
+    assert all(total == 64 for _, total, _ in calls)
+
+
+def test_progress_every_is_a_minimum_gap():
+    clock, calls = FakeClock(), []
+    progress = Progress(100, callback=lambda *args: calls.append(args), every=25, clock=clock)
+    for i in range(99):
+        clock.now += 10.
+        progress.update()
+    assert [done for done, _, _ in calls] == [25, 50, 75]
+    progress.update()
+    assert calls[-1][0] == 100
+    progress.close()
+    assert len(calls) == 4
+
+
+def test_fast_loop_writes_a_single_log_line():
+    stream = io.StringIO()
+    with Progress(64, "building lattice", callback=LogProgress(stream)) as progress:
+        for i in range(64):
+            progress.update()
+    assert stream.getvalue().splitlines() == ["building lattice: 64/64 (100.0%)"]
@@ -0,0 +1,54 @@
+import itertools
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+
+
+def per_site_build(lattice):
+    # the site by site construction the vectorized build replaced
+    if lattice.ndim == 2:
+        centered = [(lattice.xy_face_centered, (0.5, 0.5), 2)]
+    else:
+        centered = [(lattice.body_centered, (0.5, 0.5, 0.5), 2),
+                    (lattice.xy_face_centered, (0.5, 0.5, 0.), 1),
+                    (lattice.yz_face_centered, (0., 0.5, 0.5), 1),
+                    (lattice.xz_face_centered, (0.5, 0., 0.5), 1)]
+    xyz, tags, coordinates = [], [], []
+    for cell in itertools.product(*[range(s) for s in lattice.shape]):
+        sites = [(cell, 0)] + [(tuple(c + o for c, o in zip(cell, offset)), tag)
+                               for flag, offset, tag in centered if flag]
+        for c, tag in sites:
+            xyz.append(lattice[c])
+            tags.append(tag)
+            coordinates.append(c)
+    return np.array(xyz), np.array(tags), np.array(coordinates)
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D2", 5), ("D2C", 4), ("D6", 4), ("Oh", 3),
+                                                ("OhI", 3), ("OhF", 3), ("C2hS", 3), ("Ci", 3)])
+def test_vectorized_build_matches_per_site(lattice_type, size):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=size, show_progress=False, **params)
+    xyz, tags, coordinates = per_site_build(lattice)
+    assert np.array_equal(lattice.xyz, xyz)
+    assert np.array_equal(lattice.site_types, tags)
+    assert np.array_equal(lattice.coordinate, coordinates)
+    assert np.array_equal(lattice.positions(lattice.coordinate), xyz)
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D2C", 5), ("OhF", 3), ("OhI", 4)])
+def test_lazy_chunks_match_eager_arrays(lattice_type, size):
+    bases, params = get_basis_pair(lattice_type)
+    eager = BravaisLattice(bases, size=size, show_progress=False, **params)
+    lazy = BravaisLattice(bases, size=size, lazy=True, **params)
+    assert lazy.lazy and (lazy.size == eager.size)
+    chunks = list(lazy.iter_chunks(chunk_size=7))
+    assert np.array_equal(np.concatenate([c[0] for c in chunks]), np.arange(eager.size))
+    assert np.array_equal(np.concatenate([c[1] for c in chunks]), eager.doubled_coordinate)
+    assert np.array_equal(np.concatenate([c[2] for c in chunks]), eager.xyz)
+    assert np.array_equal(np.concatenate([c[3] for c in chunks]), eager.site_types)
+    assert np.array_equal(lazy.index_of(eager.doubled_coordinate, doubled=True), np.arange(eager.size))
+    # whole array accesses are computed on the fly and never kept
+    assert np.array_equal(lazy.xyz, eager.xyz)
+    assert lazy.xyz is not lazy.xyz
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.bravais_lattice.lattice_coordinates import OneAndHalfUnit, to_doubled
+
+
+LATTICES = [("D2", 5), ("D2C", 4), ("D6", 4), ("Oh", 3), ("OhI", 3), ("OhF", 3), ("C2hS", 3), ("Ci", 3)]
+
+
+def build_lattice(lattice_type, size):
+    bases, params = get_basis_pair(lattice_type)
+    return BravaisLattice(bases, size=size, show_progress=False, **params)
+
+
+def test_half_units_round_down():
+    values = [0.3, 0.9, -0.5, -0.2, 1.5, 0.5 - 1e-9, -1, 2]
+    expected = [0, 1, -1, -1, 3, 1, -2, 4]
+    assert [OneAndHalfUnit(v).doubled for v in values] == expected
+    assert to_doubled(values).tolist() == expected
+
+
+@pytest.mark.parametrize("lattice_type, size", LATTICES)
+def test_index_of_round_trips(lattice_type, size):
+    lattice = build_lattice(lattice_type, size)
+    indices = np.arange(lattice.size)
+    doubled = lattice.doubled_coordinate
+    assert np.array_equal(lattice.index_of(doubled, doubled=True), indices)
+    assert np.array_equal(lattice.index_of(lattice.coordinate), indices)
+    # periodic images map back onto the same site
+    shift = 2 * np.array(lattice.shape) * np.arange(-1, lattice.ndim - 1)
+    assert np.array_equal(lattice.index_of(doubled + shift, doubled=True), indices)
+    assert np.array_equal(np.sort(lattice.site_table.ravel()), indices)
+    # the first sublattice holds the cell corners, at even doubled coordinates
+    assert np.all(lattice.doubled_coordinate_at(lattice.site_table[0].ravel()) % 2 == 0)
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D2", 4), ("Oh", 3), ("OhI", 3)])
+def test_index_of_rejects_missing_sublattices(lattice_type, size):
+    lattice = build_lattice(lattice_type, size)
+    off_lattice = np.ones((1, lattice.ndim), dtype=np.int64)
+    off_lattice[0, 0] = 0
+    assert lattice.index_of(off_lattice, doubled=True).tolist() == [-1]
+
+
+@pytest.mark.parametrize("lattice_type, size", LATTICES)
+def test_batch_validity_matches_scalar_check(lattice_type, size):
+    lattice = build_lattice(lattice_type, size)
+    # every half unit point of the box and one half unit around it
+    axes = [np.arange(-1, 2 * s + 1) for s in lattice.shape]
+    doubled = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, lattice.ndim)
+    expected = [lattice.check_coordinate(tuple(d / 2)) for d in doubled]
+    assert lattice.check_coordinates(doubled, doubled=True).tolist() == expected
+    assert lattice.check_coordinates(doubled / 2).tolist() == expected
+    assert np.all(lattice.check_coordinates(lattice.doubled_coordinate, doubled=True))
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair, LatticeInfoArray
+from loop_stats.loops.simulator import BravaisLatticeWithLoopDefects
+
+
+@pytest.mark.parametrize("attr", ["y", ["z", "x"], ["x", "y", "z"]])
+def test_update_many_matches_scalar_updates(attr):
+    rng = np.random.default_rng(0)
+    batched = LatticeInfoArray(20, ["x", "y", "z"], dtype=np.int32)
+    scalar = LatticeInfoArray(20, ["x", "y", "z"], dtype=np.int32)
+    # repeated indices accumulate
+    indices = rng.integers(0, 20, size=200)
+    attrs = [attr] if isinstance(attr, str) else attr
+    values = rng.integers(-3, 4, size=(200, len(attrs)))
+    batched.update_many(indices, attr, values[:, 0] if isinstance(attr, str) else values)
+    for i, row in zip(indices, values):
+        for a, v in zip(attrs, row):
+            scalar.update(i, a, v)
+    assert np.array_equal(batched.data, scalar.data)
+    assert np.all(batched.data[:, batched.columns([k for k in "xyz" if k not in attrs])] == 0)
+
+
+def test_views_read_and_write_the_store():
+    bases, params = get_basis_pair("Oh")
+    system = BravaisLatticeWithLoopDefects(bases, size=3, show_progress=False, **params)
+    info = system.info_at((1, 2, 0))
+    info.load_dict(x=4, z=-2)
+    system.info_update((1, 2, 0), 'y', 3)
+    index = system.site_index((1, 2, 0))
+    assert system.info_array[index].tolist() == [4, 3, -2]
+    assert info.to_dict() == dict(x=4, y=3, z=-2)
+    assert np.count_nonzero(system.info_array) == 3
+    with pytest.raises(IndexError):
+        system.site_index((0.5, 0, 0))
@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+import loop_stats
+
+
+HEAVY = ["matplotlib", "networkx", "pandas", "scipy", "tqdm"]
+# the partition code builds scipy.sparse tables, the simulator cannot start without it
+EAGER = {"loop_stats.loops.simulator": ["scipy"]}
+SCRIPT = """
+import sys, json, importlib
+package = importlib.import_module(sys.argv[1])
+loaded = sorted(m for m in json.loads(sys.argv[2]) if m in sys.modules)
+names = getattr(package, '__all__', [])
+missing = [name for name in names if not hasattr(package, name)]
+print(json.dumps(dict(loaded=loaded, names=len(names), missing=missing)))
+"""
+
+
+def import_in_subprocess(package):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(loop_stats.__file__)))
+    output = subprocess.run([sys.executable, "-c", SCRIPT, package, json.dumps(HEAVY)],
+                            cwd=root, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("package", ["loop_stats", "loop_stats.bravais_lattice", "loop_stats.loops",
+                                     "loop_stats.loops.simulator"])
+def test_heavy_dependencies_are_deferred_and_all_names_resolve(package):
+    result = import_in_subprocess(package)
+    assert result["loaded"] == EAGER.get(package, [])
+    assert result["missing"] == []
+    if package != "loop_stats":
+        assert result["names"] > 0
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.loops import FundamentalLoopDefect, LoopRegistry, anti_cycle
+from loop_stats.loops.enumeration import enumerate_loops
+
+
+# self avoiding polygons per translation, counted without orientation
+POLYGON_COUNTS = {
+    "D4": {4: 1, 6: 2, 8: 7, 10: 28},
+    "D6": {3: 2, 4: 3, 5: 6, 6: 15, 7: 42, 8: 123},
+    "Oh": {4: 3, 6: 22, 8: 207},
+    "OhF": {3: 8, 4: 33, 5: 168, 6: 970},
+}
+
+
+@pytest.mark.parametrize("lattice_type", sorted(POLYGON_COUNTS))
+def test_polygon_counts(lattice_type):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=4, **params)
+    expected = POLYGON_COUNTS[lattice_type]
+    library = enumerate_loops(lattice, max(expected))
+    assert library.count_by_length() == expected
+    assert len(library.loops(expand=True)) == sum(expected.values())
+
+
+def test_reversed_loop_shares_orbit_key():
+    bases, params = get_basis_pair("D4")
+    lattice = BravaisLattice(bases, size=4, **params)
+    loop = FundamentalLoopDefect([(0, 1), (0, 1), (1, 0), (0, -1), (0, -1), (-1, 0)])
+    identity = np.eye(2, dtype=np.int64)[None]
+    assert loop.orbit_key(identity) == anti_cycle(loop).orbit_key(identity)
+    assert loop.orbit_key(lattice.point_group) == anti_cycle(loop).orbit_key(lattice.point_group)
+
+
+@pytest.mark.parametrize("lattice_type, max_length", [("D4", 8), ("D6", 6), ("Oh", 6)])
+def test_orbits_agree_with_library_counts(lattice_type, max_length):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=4, show_progress=False, **params)
+    library = enumerate_loops(lattice, max_length)
+    registry = LoopRegistry(lattice.point_group)
+    for i in range(len(library)):
+        loop = library[i]
+        assert len(loop.orbit(lattice.point_group)) == library.counts[i]
+        assert len(registry.orbit(anti_cycle(loop))) == library.counts[i]
+        assert registry.orbit(anti_cycle(loop)) == registry.orbit(loop)
+    registry.add_orbit(library[0])
+    assert len(registry) == 2 * library.counts[0]
+    assert len(set(registry.orbit_labels().tolist())) == 1
+
+
+def test_cyclic_shifts_touch_different_sites():
+    steps = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    loops = [FundamentalLoopDefect(steps[k:] + steps[:k]) for k in range(len(steps))]
+    # anchored at the same site the shifts cover four different plaquettes
+    assert len(set(tuple(map(tuple, loop.path.tolist())) for loop in loops)) == 4
+    assert len(set(loops)) == 4
+    assert loops[0] == FundamentalLoopDefect(steps)
+    # they are equal up to translation
+    assert len(set(loop.unoriented_form for loop in loops)) == 1
+    registry = LoopRegistry()
+    ids = registry.extend(loops)
+    assert ids == [0, 1, 2, 3]
+    for loop, i in zip(loops, ids):
+        assert registry.index(loop) == i
+        assert np.array_equal(registry[i].path, loop.path)
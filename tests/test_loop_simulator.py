@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.loops import FundamentalLoopDefect, anti_cycle
+from loop_stats.loops.simulator import BravaisLatticeWithLoopDefects, LoopDefectSimulator, SlabDecomposition
+from loop_stats.loops.simulator import load_checkpoint, save_checkpoint, ScalingStudyRunner
+from loop_stats.loops.simulator.runner import parameter_grid
+from loop_stats.loops.simulator.simulator import compile_loop_moves
+from loop_stats.loops.simulator.utility import is_conflict_free
+
+
+LATTICES = [("D2", 16, [(0, 1), (1, 0), (0, -1), (-1, 0)]),
+            ("D2C", 12, [(0.5, 0.5), (0.5, -0.5), (-0.5, -0.5), (-0.5, 0.5)]),
+            ("OhF", 6, [(0.5, 0.5, 0), (0, -0.5, 0.5), (-0.5, 0, -0.5)])]
+
+
+def build_system(lattice_type, size, offsets):
+    bases, params = get_basis_pair(lattice_type, theta=np.pi / 3, alpha=np.pi / 3)
+    system = BravaisLatticeWithLoopDefects(bases, size=size, show_progress=False, **params)
+    loop = FundamentalLoopDefect(offsets)
+    system.register_loop([loop, anti_cycle(loop)])
+    return system
+
+
+def build_simulator(lattice_type, size, offsets, **kwargs):
+    return LoopDefectSimulator(build_system(lattice_type, size, offsets),
+                               beta=0.7, chemical_potential=-0.25, seed=7, **kwargs)
+
+
+def test_anti_cycle_compiles_to_negated_field():
+    bases, params = get_basis_pair("D4")
+    system = BravaisLatticeWithLoopDefects(bases, size=8, show_progress=False, **params)
+    loop = FundamentalLoopDefect([(0, 1), (0, 1), (1, 0), (0, -1), (0, -1), (-1, 0)])
+    system.register_loop([loop, anti_cycle(loop)])
+    offsets, steps, mask = compile_loop_moves(system)
+    assert np.array_equal(offsets[0], offsets[1])
+    assert np.array_equal(mask[0], mask[1])
+    assert np.array_equal(steps[1], -steps[0])
+    assert np.array_equal(offsets[0][mask[0]], np.unique(loop.path, axis=0))
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+def test_partitions_are_conflict_free(lattice_type, size, offsets):
+    simulator = build_simulator(lattice_type, size, offsets)
+    system = simulator.system
+    assert is_conflict_free(system, system.loop_group, simulator.partitions, overlap=True)
+    assert sum(len(p) for p in simulator.partitions) == system.size
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+def test_field_is_sum_of_placed_loops(lattice_type, size, offsets):
+    simulator = build_simulator(lattice_type, size, offsets)
+    simulator.sweep(10)
+    system = simulator.system
+    assert simulator.loop_count() > 0
+    expected = np.zeros_like(system.defect_field)
+    coordinates = system.doubled_coordinate.astype(np.int64)
+    for site, loop_id in zip(*np.nonzero(system.loop_occupancy)):
+        loop = system.registered_loop(int(loop_id))
+        vertices = system.index_of(coordinates[site] + loop.path.astype(np.int64), doubled=True)
+        count = system.loop_occupancy[site, loop_id]
+        np.add.at(expected, vertices, count * (loop.stencil + np.roll(loop.stencil, 1, axis=0)))
+    assert np.array_equal(system.defect_field, expected)
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+@pytest.mark.parametrize("n_slabs", [1, 2, 3])
+def test_slab_decomposition_is_bitwise_identical(lattice_type, size, offsets, n_slabs):
+    serial = build_simulator(lattice_type, size, offsets)
+    serial.sweep(10)
+    decomposed = build_simulator(lattice_type, size, offsets, partitions=serial.partitions)
+    decomposed.sweep(10, decomposition=SlabDecomposition(decomposed.system, n_slabs))
+    assert np.array_equal(decomposed.system.defect_field, serial.system.defect_field)
+    assert np.array_equal(decomposed.system.loop_occupancy, serial.system.loop_occupancy)
+    assert decomposed.acceptance_rate == serial.acceptance_rate
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", LATTICES)
+def test_checkpoint_resume_is_bitwise_identical(lattice_type, size, offsets, tmp_path):
+    reference = build_simulator(lattice_type, size, offsets)
+    reference.sweep(10)
+    interrupted = build_simulator(lattice_type, size, offsets)
+    interrupted.sweep(4)
+    path = os.path.join(tmp_path, "run.npz")
+    save_checkpoint(path, interrupted)
+    resumed, _ = load_checkpoint(path)
+    assert resumed.sweep_count == 4
+    resumed.sweep(6)
+    assert np.array_equal(resumed.system.defect_field, reference.system.defect_field)
+    assert np.array_equal(resumed.system.loop_occupancy, reference.system.loop_occupancy)
+    assert os.listdir(tmp_path) == ["run.npz"]
+
+
+def test_runner_reports_peak_memory_per_point():
+    loop = FundamentalLoopDefect(LATTICES[0][2])
+    runner = ScalingStudyRunner([loop, anti_cycle(loop)], n_workers=2)
+    results = runner.run(parameter_grid(lattice_type=["D2"], size=[16, 256], seed=[0, 1], n_sweeps=[2]))
+    assert len(set(r['worker_pid'] for r in results)) == len(results)
+    small, large = [[r['max_rss_bytes'] for r in results if r['size'] == size] for size in (16, 256)]
+    assert max(small) < min(large)
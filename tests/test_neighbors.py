@@ -0,0 +1,28 @@
+import itertools
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+
+
+def brute_force_shells(lattice, k, reach=6):
+    cells = np.array(list(itertools.product(range(-reach, reach + 1), repeat=lattice.ndim)))
+    doubled = (2 * cells[:, None, :] + lattice.sublattice_offsets[None, :, :]).reshape(-1, lattice.ndim)
+    doubled = doubled[np.any(doubled != 0, axis=1)]
+    distances = np.linalg.norm((doubled / 2) @ lattice.basis_matrix, axis=1)
+    radii = np.unique(np.round(distances, 8))[:k]
+    return radii, [sorted(map(tuple, doubled[np.isclose(distances, r)].tolist())) for r in radii]
+
+
+@pytest.mark.parametrize("lattice_type", ["D2", "D2C", "D4", "D6", "Oh", "OhI", "OhF", "C2hS", "Ci"])
+def test_neighbor_shells_match_brute_force(lattice_type):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=3, show_progress=False, **params)
+    distances, shells = lattice.neighbor_shells(k=4)
+    radii, expected = brute_force_shells(lattice, 4)
+    assert np.allclose(distances, radii)
+    assert [sorted(map(tuple, shell.tolist())) for shell in shells] == expected
+    # a smaller k is a prefix of the cached shells
+    fewer, first = lattice.neighbor_shells(k=2)
+    assert np.array_equal(fewer, distances[:2])
+    assert all(np.array_equal(a, b) for a, b in zip(first, shells))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from loop_stats.loops.observables import AutocorrelationEstimator, BinningAnalysis, Welford
+from loop_stats.loops.observables import pack_states, unpack_states
+
+
+PHI = 0.9
+
+
+@pytest.fixture(scope="module")
+def ar1_series():
+    # x_t = phi x_(t-1) + e_t has the integrated autocorrelation time (1 + phi) / (2 (1 - phi))
+    rng = np.random.default_rng(0)
+    noise = rng.normal(size=1 << 18)
+    x = np.empty_like(noise)
+    x[0] = noise[0]
+    for i in range(1, len(x)):
+        x[i] = PHI * x[i - 1] + noise[i]
+    return x
+
+
+def test_welford_matches_numpy(ar1_series):
+    welford = Welford()
+    for chunk in np.array_split(ar1_series, 37):
+        welford.add_many(chunk)
+    assert welford.count == len(ar1_series)
+    assert np.isclose(welford.mean, ar1_series.mean())
+    assert np.isclose(welford.variance, ar1_series.var(ddof=1))
+
+
+def test_ar1_autocorrelation_time(ar1_series):
+    exact = (1 + PHI) / (2 * (1 - PHI))
+    binning, autocorrelation = BinningAnalysis(), AutocorrelationEstimator(200)
+    for chunk in np.array_split(ar1_series, 37):
+        binning.add_many(chunk)
+        autocorrelation.add_many(chunk)
+    assert abs(binning.autocorrelation_time() - exact) < 0.05 * exact
+    assert abs(autocorrelation.integrated_time() - exact) < 0.05 * exact
+
+
+def test_binning_merge_matches_single_stream(ar1_series):
+    half = len(ar1_series) // 2
+    first, second, single = BinningAnalysis(), BinningAnalysis(), BinningAnalysis()
+    first.add_many(ar1_series[:half])
+    second.add_many(ar1_series[half:])
+    single.add_many(ar1_series)
+    merged = unpack_states(pack_states(dict(a=first)))['a'].merge(second)
+    assert np.array_equal(merged.bin_counts(), single.bin_counts())
+    assert np.allclose(merged.std_errors(), single.std_errors(), equal_nan=True)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice
+from loop_stats.loops import FundamentalLoopDefect, anti_cycle, generate_defect_coordinates
+from loop_stats.loops.simulator import independent_node_partition
+from loop_stats.loops.simulator.coloring import conflict_graph, jones_plassmann_coloring
+from loop_stats.loops.simulator.utility import periodic_node_partition, loop_neighbor_table, is_conflict_free
+
+
+PLAQUETTES = {2: [(0, 1), (1, 0), (0, -1), (-1, 0)],
+              3: [(0, 1, 0), (0, 0, 1), (0, -1, 0), (0, 0, -1)]}
+D2C_DIAMOND = [(0.5, 0.5), (0.5, -0.5), (-0.5, -0.5), (-0.5, 0.5)]
+FCC_TRIANGLE = [(0.5, 0.5, 0), (0, -0.5, 0.5), (-0.5, 0, -0.5)]
+
+
+def build_lattice(lattice_type, size, offsets=None):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=size, show_progress=False, **params)
+    loop = FundamentalLoopDefect(PLAQUETTES[lattice.ndim] if offsets is None else offsets)
+    return lattice, [loop, anti_cycle(loop)]
+
+
+def color_period(lattice, colors, axis):
+    shift = np.zeros(lattice.ndim, dtype=np.int64)
+    for p in range(1, lattice.shape[axis] + 1):
+        shift[axis] = 2 * p
+        if np.array_equal(colors, colors[lattice.index_of(lattice.doubled_coordinate + shift, doubled=True)]):
+            return p
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D2", 32), ("Oh", 8)])
+def test_periodic_path_is_taken(lattice_type, size):
+    lattice, loops = build_lattice(lattice_type, size)
+    partitions = periodic_node_partition(lattice, loops)
+    assert partitions is not None
+    assert len(partitions) == 4
+    assert len(set(len(p) for p in partitions)) == 1
+    default = independent_node_partition(lattice, loops, show_progress=False)
+    assert all(np.array_equal(p, q) for p, q in zip(default, partitions))
+
+
+def test_jones_plassmann_coloring_is_proper_and_deterministic():
+    lattice, loops = build_lattice("D2", 61)
+    adjacency = conflict_graph(loop_neighbor_table(lattice, loops))
+    colors = jones_plassmann_coloring(adjacency)
+    rows, cols = adjacency.nonzero()
+    assert np.all(colors >= 0)
+    assert not np.any(colors[rows] == colors[cols])
+    assert colors.max() <= np.diff(adjacency.indptr).max()
+    assert np.array_equal(colors, jones_plassmann_coloring(adjacency))
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", [("D2", 5, None), ("OhF", 3, FCC_TRIANGLE)])
+def test_loop_neighbor_table_matches_brute_force(lattice_type, size, offsets):
+    lattice, loops = build_lattice(lattice_type, size, offsets)
+    touched = [set(int(lattice.index_of(np.array(c.to_list()))) for loop in loops
+                   for c in generate_defect_coordinates(loop, tuple(x), lattice.shape))
+               for x in lattice.coordinate]
+    table = loop_neighbor_table(lattice, loops)
+    anchored = loop_neighbor_table(lattice, loops, include_anchor=True)
+    overlap = loop_neighbor_table(lattice, loops, overlap=True)
+    anchored_overlap = loop_neighbor_table(lattice, loops, overlap=True, include_anchor=True)
+    for i in range(lattice.size):
+        assert set(table[i].indices.tolist()) == touched[i] - {i}
+        assert set(anchored[i].indices.tolist()) == touched[i]
+        sharing = {j for j in range(lattice.size) if (j != i) and (touched[i] & touched[j])}
+        assert set(overlap[i].indices.tolist()) == sharing
+        assert set(anchored_overlap[i].indices.tolist()) == sharing | {i}
+
+
+@pytest.mark.parametrize("lattice_type, size, offsets", [("D2", 12, None), ("D2C", 8, D2C_DIAMOND),
+                                                         ("Oh", 6, None), ("OhF", 6, FCC_TRIANGLE)])
+@pytest.mark.parametrize("overlap", [False, True])
+def test_periodic_partition_is_conflict_free_and_periodic(lattice_type, size, offsets, overlap):
+    lattice, loops = build_lattice(lattice_type, size, offsets)
+    partitions = periodic_node_partition(lattice, loops, overlap=overlap)
+    assert partitions is not None
+    assert np.array_equal(np.sort(np.concatenate(partitions)), np.arange(lattice.size))
+    assert is_conflict_free(lattice, loops, partitions, overlap=overlap)
+    colors = np.empty(lattice.size, dtype=np.intp)
+    for c, nodes in enumerate(partitions):
+        colors[nodes] = c
+    # the supercell coloring repeats with a period shorter than the lattice along some axis
+    periods = [color_period(lattice, colors, axis) for axis in range(lattice.ndim)]
+    assert periods != list(lattice.shape)
+
+
+@pytest.mark.parametrize("lattice_type, size", [("D2", 12), ("Oh", 6)])
+def test_periodic_partition_follows_seed(lattice_type, size):
+    lattice, loops = build_lattice(lattice_type, size)
+
+    def partition(seed):
+        return independent_node_partition(lattice, loops, seed=seed, show_progress=False)
+
+    def same(p, q):
+        return (len(p) == len(q)) and all(np.array_equal(a, b) for a, b in zip(p, q))
+
+    assert same(partition(1), partition(1))
+    assert not same(partition(0), partition(1))
+    assert is_conflict_free(lattice, loops, partition(1))
@@ -0,0 +1,58 @@
+import itertools
+import numpy as np
+import pytest
+from loop_stats.bravais_lattice import get_basis_pair
+from loop_stats.bravais_lattice import BravaisLattice, lll_reduce, minimum_image
+from loop_stats.bravais_lattice.reduction import LLL_DELTA, _gram_schmidt
+
+
+def skewed_basis(ndim, rng):
+    # a reduced basis mixed by a random unimodular matrix
+    transform = np.eye(ndim, dtype=np.int64)
+    for _ in range(6):
+        i, j = rng.choice(ndim, size=2, replace=False)
+        transform[i] += rng.integers(-3, 4) * transform[j]
+    return transform @ (np.eye(ndim) + 0.2 * rng.normal(size=(ndim, ndim)))
+
+
+@pytest.mark.parametrize("ndim", [2, 3])
+def test_lll_reduce_is_reduced_and_unimodular(ndim):
+    rng = np.random.default_rng(ndim)
+    for _ in range(20):
+        basis = skewed_basis(ndim, rng)
+        reduced, transform = lll_reduce(basis)
+        assert np.allclose(reduced, transform @ basis)
+        assert round(abs(np.linalg.det(transform))) == 1
+        assert np.linalg.det(transform) > 0
+        ortho, mu = _gram_schmidt(reduced)
+        assert np.all(np.abs(np.tril(mu, -1)) <= 0.5 + 1e-9)
+        for k in range(1, ndim):
+            assert ortho[k] @ ortho[k] >= (LLL_DELTA - mu[k, k - 1] ** 2) * (ortho[k - 1] @ ortho[k - 1]) - 1e-9
+
+
+@pytest.mark.parametrize("ndim", [2, 3])
+def test_minimum_image_matches_brute_force(ndim):
+    rng = np.random.default_rng(10 + ndim)
+    cell = skewed_basis(ndim, rng)
+    dr = rng.uniform(-4, 4, size=(500, ndim)) @ cell
+    shortest = minimum_image(dr, lll_reduce(cell)[0], chunk_size=64)
+    shifts = np.array(list(itertools.product(range(-8, 9), repeat=ndim))) @ cell
+    images = dr[:, None, :] + shifts[None, :, :]
+    expected = np.linalg.norm(images, axis=-1).min(axis=1)
+    assert np.allclose(np.linalg.norm(shortest, axis=1), expected)
+    # the result is an image of the input
+    fractional = (shortest - dr) @ np.linalg.inv(cell)
+    assert np.allclose(fractional, np.rint(fractional))
+
+
+@pytest.mark.parametrize("lattice_type", ["D2", "D6", "OhF", "Ci"])
+def test_lattice_minimum_image_of_site_pairs(lattice_type):
+    bases, params = get_basis_pair(lattice_type)
+    lattice = BravaisLattice(bases, size=4, show_progress=False, **params)
+    doubled = lattice.doubled_coordinate.astype(np.int64)
+    dr = doubled[:, None, :] - doubled[None, :7, :]
+    shortest = lattice.minimum_image(dr, doubled=True)
+    shifts = 2 * np.array(list(itertools.product(range(-2, 3), repeat=lattice.ndim))) * np.array(lattice.shape)
+    lengths = np.linalg.norm(((dr[..., None, :] + shifts) / 2) @ lattice.basis_matrix, axis=-1).min(axis=-1)
+    assert np.allclose(np.linalg.norm((shortest / 2) @ lattice.basis_matrix, axis=-1), lengths)
+    assert np.all((shortest - dr) % (2 * np.array(lattice.shape)) == 0)